@@ -0,0 +1,47 @@
+"""
+Operations per second of each installed BLS backend in ``utils.bls``.
+
+    python -m benchmarks.bls [--rounds N]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import (
+    Callable,
+    List,
+)
+
+from utils.bls import (
+    available_backends,
+    conforms_to_reference,
+)
+
+
+def ops_per_second(operations: List[Callable[[], object]]) -> float:
+    start = perf_counter()
+    for operation in operations:
+        operation()
+    return len(operations) / (perf_counter() - start)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark BLS backends')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    privkeys = [2**250 + i for i in range(args.rounds)]
+    message = bytes(32)
+    print('%-10s %10s %14s %10s %10s' % ('backend', 'conforms', 'priv_to_pub/s', 'sign/s', 'verify/s'))
+    for name, backend in available_backends().items():
+        pubkeys = [backend.priv_to_pub(privkey) for privkey in privkeys]
+        signatures = [backend.sign(privkey, message) for privkey in privkeys]
+        results = [
+            ops_per_second([lambda k=privkey: backend.priv_to_pub(k) for privkey in privkeys]),
+            ops_per_second([lambda k=privkey: backend.sign(k, message) for privkey in privkeys]),
+            ops_per_second([lambda p=pubkey, s=signature: backend.verify(p, message, s)
+                            for pubkey, signature in zip(pubkeys, signatures)]),
+        ]
+        print('%-10s %10s %14.1f %10.1f %10.1f' % (name, conforms_to_reference(backend), *results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Memory held by ``credentials.CredentialSet`` against the per-validator dicts ``deposit.calculate_credentials``
+used to return, with both pubkeys cached. SKs are random rather than derived so that large counts are quick.
+
+    python -m benchmarks.credentials [--num_validators N]
+"""
+from argparse import ArgumentParser
+from secrets import randbits
+import tracemalloc
+from typing import (
+    Any,
+    Callable,
+    List,
+    Tuple,
+)
+
+from credentials import (
+    Credential,
+    CredentialSet,
+)
+
+KeyPairs = List[Tuple[int, int]]
+
+
+def dict_credentials(sks: KeyPairs) -> List[Any]:
+    credentials = []
+    for i, (signing_sk, withdrawal_sk) in enumerate(sks):
+        credentials.append({
+            'index': i,
+            'withdrawal_path': 'm/12381/3600/%s/0' % i,
+            'withdrawal_sk': withdrawal_sk,
+            'signing_path': 'm/12381/3600/%s/0/0' % i,
+            'signing_sk': signing_sk,
+            'amount': 32 * 10**9,
+            'signing_pubkey': bytes([0x80]) + bytes(47),
+            'withdrawal_pubkey': bytes([0x80]) + bytes(47),
+        })
+    return credentials
+
+
+def slotted_credentials(sks: KeyPairs) -> CredentialSet:
+    credentials = CredentialSet(Credential(i, signing_sk=s, withdrawal_sk=w) for i, (s, w) in enumerate(sks))
+    for credential in credentials:
+        credential.set_pubkey('signing', bytes([0x80]) + bytes(47))
+        credential.set_pubkey('withdrawal', bytes([0x80]) + bytes(47))
+    return credentials
+
+
+def allocated_bytes(build: Callable[[KeyPairs], Any], sks: KeyPairs) -> int:
+    tracemalloc.start()
+    credentials = build(sks)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del credentials
+    return allocated
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark credential memory use')
+    parser.add_argument('--num_validators', type=int, default=50000)
+    args = parser.parse_args()
+
+    sks = [(randbits(255), randbits(255)) for _ in range(args.num_validators)]
+    results = {
+        'dict': allocated_bytes(dict_credentials, sks),
+        'slotted': allocated_bytes(slotted_credentials, sks),
+    }
+    for name, allocated in results.items():
+        print('%-8s %8.2f MiB %8.0f bytes/validator' % (name, allocated / 2**20, allocated / args.num_validators))
+    print('saving   %8.2fx' % (results['dict'] / results['slotted']))
+
+
+if __name__ == '__main__':
+    main()
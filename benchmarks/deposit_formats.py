@@ -0,0 +1,92 @@
+"""
+File size and load time of JSON against binary SSZ deposit data, for entries with random keys and signatures
+(so that large counts are quick to generate).
+
+    python -m benchmarks.deposit_formats [--num_deposits N]
+"""
+from argparse import ArgumentParser
+import json
+import os
+from random import (
+    Random,
+    randrange,
+)
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+)
+
+from deposit import (
+    DepositDataWriter,
+    iter_deposit_data,
+)
+from deposit_ssz import (
+    SszDepositData,
+    SszDepositDataWriter,
+)
+
+
+def random_entries(num_deposits: int) -> Iterator[Dict[str, Any]]:
+    random = Random(0)
+    for _ in range(num_deposits):
+        yield {
+            'pubkey': random.randbytes(48),
+            'withdrawal_credentials': random.randbytes(32),
+            'amount': 32 * 10**9,
+            'signature': random.randbytes(96),
+            'deposit_data_root': random.randbytes(32),
+        }
+
+
+def load_json(file: str) -> int:
+    with open(file, 'r') as f:
+        entries = json.load(f)
+    return sum(len(bytes.fromhex(entry['signature'])) for entry in entries)
+
+
+def stream_json(file: str) -> int:
+    return sum(len(bytes.fromhex(entry['signature'])) for entry in iter_deposit_data(file))
+
+
+def load_ssz(file: str) -> int:
+    with SszDepositData(file) as deposit_data:
+        return sum(len(deposit_data.field(i, 'signature')) for i in range(len(deposit_data)))
+
+
+def ssz_random_access(file: str) -> int:
+    with SszDepositData(file) as deposit_data:
+        return sum(len(deposit_data.entry(randrange(len(deposit_data)))['signature']) for _ in range(1000))
+
+
+def timed(fn: Callable[[str], int], file: str) -> float:
+    start = perf_counter()
+    fn(file)
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark JSON against binary SSZ deposit data')
+    parser.add_argument('--num_deposits', type=int, default=100000)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as folder:
+        json_file, ssz_file = os.path.join(folder, 'deposit_data.json'), os.path.join(folder, 'deposit_data.ssz')
+        for writer_cls, file in ((DepositDataWriter, json_file), (SszDepositDataWriter, ssz_file)):
+            start = perf_counter()
+            with writer_cls(file) as writer:
+                for entry in random_entries(args.num_deposits):
+                    writer.write(entry)
+            print('write %-5s %10.1f MiB %10.3fs' % (
+                file.rsplit('.', 1)[1], os.path.getsize(file) / 2**20, perf_counter() - start))
+        print('json.load + hex decode            %10.3fs' % timed(load_json, json_file))
+        print('iter_deposit_data (JSON)          %10.3fs' % timed(stream_json, json_file))
+        print('SszDepositData signature views    %10.3fs' % timed(load_ssz, ssz_file))
+        print('SszDepositData 1000 random entries %9.3fs' % timed(ssz_random_access, ssz_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Per-entry cost of the message, signing and data roots of a deposit through the generic ``ssz`` containers
+against ``utils.deposit_roots.DepositRoots``.
+
+    python -m benchmarks.deposit_roots [--num_entries N]
+"""
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+from typing import (
+    Callable,
+    List,
+    Tuple,
+)
+
+from utils.bls import (
+    compute_domain,
+    compute_signing_root,
+)
+from utils.containers import (
+    DepositData,
+    DepositMessage,
+)
+from utils.deposit_roots import DepositRoots
+
+Entry = Tuple[bytes, bytes, int, bytes]
+
+
+def ssz_roots(entry: Entry) -> Tuple[bytes, bytes, bytes]:
+    pubkey, withdrawal_credentials, amount, signature = entry
+    deposit_message = DepositMessage(pubkey=pubkey, withdrawal_credentials=withdrawal_credentials, amount=amount)
+    deposit = DepositData(**deposit_message.as_dict(), signature=signature)
+    return (deposit_message.hash_tree_root, compute_signing_root(deposit_message, compute_domain()),
+            deposit.hash_tree_root)
+
+
+def specialized_roots(entry: Entry) -> Tuple[bytes, bytes, bytes]:
+    pubkey, withdrawal_credentials, amount, signature = entry
+    roots = DepositRoots(pubkey, withdrawal_credentials, amount)
+    return roots.message_root, roots.signing_root(), roots.data_root(signature)
+
+
+def time_per_entry(fn: Callable[[Entry], Tuple[bytes, bytes, bytes]], entries: List[Entry]) -> float:
+    start = perf_counter()
+    for entry in entries:
+        fn(entry)
+    return (perf_counter() - start) / len(entries)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark deposit container roots')
+    parser.add_argument('--num_entries', type=int, default=2000)
+    args = parser.parse_args()
+
+    random = Random(0)
+    entries = [(random.randbytes(48), random.randbytes(32), 32 * 10**9, random.randbytes(96))
+               for _ in range(args.num_entries)]
+    assert all(ssz_roots(entry) == specialized_roots(entry) for entry in entries[:100])
+    ssz_time = time_per_entry(ssz_roots, entries)
+    specialized_time = time_per_entry(specialized_roots, entries)
+    print('ssz containers  %10.1f us/entry' % (ssz_time * 10**6))
+    print('DepositRoots    %10.1f us/entry  (%.1fx)' % (specialized_time * 10**6, ssz_time / specialized_time))
+
+
+if __name__ == '__main__':
+    main()
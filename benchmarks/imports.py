@@ -0,0 +1,48 @@
+"""
+Import time of the entry-point modules, as reported by ``python -X importtime`` in a fresh interpreter, with
+the slowest of the modules each one pulls in.
+
+    python -m benchmarks.imports [--modules NAME ...] [--top N]
+"""
+from argparse import ArgumentParser
+import subprocess
+import sys
+from typing import (
+    List,
+    Tuple,
+)
+
+MODULES = ['deposit', 'keystores', 'verify', 'utils.bls', 'key_derivation.mnemonic']
+
+
+def import_times(module: str) -> List[Tuple[int, str]]:
+    """
+    Return ``(cumulative microseconds, name)`` for every module imported by ``import module``.
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                            check=True, stderr=subprocess.PIPE, universal_newlines=True).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative), name.strip()))
+    return times
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark module import time')
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest imported modules to list')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        times = import_times(module)
+        total = max(times)[0]
+        print('%-28s %8.1f ms' % (module, total / 1000))
+        for cumulative, name in sorted(times, reverse=True)[1:args.top + 1]:
+            print('    %-24s %8.1f ms' % (name, cumulative / 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-derivation latency of the batched Lamport engine in ``key_derivation.tree`` against the original
+per-chunk implementation, checked against the EIP-2333 test vectors.
+
+    python -m benchmarks.lamport [--rounds N] [--batch N]
+"""
+from argparse import ArgumentParser
+from json import load
+from time import perf_counter
+
+from key_derivation.tree import (
+    HKDF_mod_r,
+    IKM_to_lamport_SK,
+    derive_child_SKs,
+    flip_bits,
+    parent_SKs_to_lamport_PKs,
+)
+from utils.crypto import SHA256
+
+TEST_VECTORS = 'tests/test_key_derivation/test_vectors/'
+
+
+def reference_parent_SK_to_lamport_PK(*, parent_SK: int, index: int) -> bytes:
+    salt = index.to_bytes(4, byteorder='big')
+    lamport_0 = IKM_to_lamport_SK(IKM=parent_SK.to_bytes(32, byteorder='big'), salt=salt)
+    lamport_1 = IKM_to_lamport_SK(IKM=flip_bits(parent_SK).to_bytes(32, byteorder='big'), salt=salt)
+    return SHA256(b''.join([SHA256(sk) for sk in lamport_0 + lamport_1]))
+
+
+def reference_derive_child_SK(*, parent_SK: int, index: int) -> int:
+    return HKDF_mod_r(IKM=reference_parent_SK_to_lamport_PK(parent_SK=parent_SK, index=index))
+
+
+def check_test_vectors() -> None:
+    with open(TEST_VECTORS + 'tree_kdf.json', 'r') as f:
+        tests = load(f)['kdf_tests']
+    parent_SKs = [test['master_SK'] for test in tests]
+    indices = [test['child_index'] for test in tests]
+    assert derive_child_SKs(parent_SKs=parent_SKs, indices=indices) == [test['child_SK'] for test in tests]
+    assert [reference_derive_child_SK(parent_SK=p, index=i) for p, i in zip(parent_SKs, indices)] == \
+        [test['child_SK'] for test in tests]
+    with open(TEST_VECTORS + 'tree_kdf_intermediate.json', 'r') as f:
+        test = load(f)
+    lamport_PKs = parent_SKs_to_lamport_PKs(parent_SKs=[test['master_SK']], indices=[test['child_index']])
+    assert lamport_PKs == [bytes.fromhex(test['compressed_lamport_PK'])]
+
+
+def time_per_derivation(derive, rounds: int, batch: int) -> float:
+    start = perf_counter()
+    for _ in range(rounds):
+        derive(batch)
+    return (perf_counter() - start) / (rounds * batch)
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark Lamport child key derivation')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=16, help='Children derived per batched call')
+    args = parser.parse_args()
+
+    check_test_vectors()
+    parent_SK = 2**255 - 19
+    results = {
+        'reference': time_per_derivation(
+            lambda n: [reference_derive_child_SK(parent_SK=parent_SK, index=i) for i in range(n)],
+            args.rounds, args.batch),
+        'batched': time_per_derivation(
+            lambda n: derive_child_SKs(parent_SKs=[parent_SK] * n, indices=list(range(n))),
+            args.rounds, args.batch),
+    }
+    for name, seconds in results.items():
+        print('%-10s %8.3f ms/derivation' % (name, seconds * 1000))
+    print('speedup    %8.2fx' % (results['reference'] / results['batched']))
+
+
+if __name__ == '__main__':
+    main()
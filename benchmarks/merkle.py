@@ -0,0 +1,61 @@
+"""
+Merkle tree and root of 2**16 and 2**20 leaves through the layer-hashing engine of ``utils.merkle_minimal``,
+against the per-pair concatenate-and-hash loop it replaced.
+
+    python -m benchmarks.merkle [--log_sizes 16 20]
+"""
+from argparse import ArgumentParser
+import os
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    List,
+)
+
+from utils.crypto import SHA256
+from utils.merkle_minimal import (
+    calc_merkle_tree_from_leaves,
+    get_merkle_root,
+    merkleize_chunks,
+    zerohashes,
+)
+
+
+def pairwise_tree(values: List[bytes], layer_count: int) -> List[List[bytes]]:
+    values = list(values)
+    tree = [values[::]]
+    for h in range(layer_count):
+        if len(values) % 2 == 1:
+            values.append(zerohashes[h])
+        values = [SHA256(values[i] + values[i + 1]) for i in range(0, len(values), 2)]
+        tree.append(values[::])
+    return tree
+
+
+def seconds(fn: Callable[[], Any]) -> float:
+    start = perf_counter()
+    fn()
+    return perf_counter() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmark Merkle tree hashing')
+    parser.add_argument('--log_sizes', type=int, nargs='+', default=[16, 20])
+    args = parser.parse_args()
+
+    for log_size in args.log_sizes:
+        buffer = os.urandom(32 << log_size)
+        leaves = [buffer[i:i + 32] for i in range(0, len(buffer), 32)]
+        assert pairwise_tree(leaves, log_size)[-1][0] == merkleize_chunks(leaves)
+        pairwise = seconds(lambda: pairwise_tree(leaves, 32))
+        print('2**%s leaves' % log_size)
+        print('    pairwise tree (32 layers)          %8.3fs' % pairwise)
+        tree = seconds(lambda: calc_merkle_tree_from_leaves(leaves))
+        print('    calc_merkle_tree_from_leaves       %8.3fs  (%.1fx)' % (tree, pairwise / tree))
+        print('    get_merkle_root (pad_to=2**32)     %8.3fs' % seconds(lambda: get_merkle_root(leaves, 2**32)))
+        print('    merkleize_chunks                   %8.3fs' % seconds(lambda: merkleize_chunks(leaves)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Load generator for the signing service: ``--concurrency`` callers send ``--requests`` sign requests in all and
+the client-side throughput and latency percentiles are reported with the service's own counters. Without
+``--socket``, a service holding ``--num_keys`` random SKs is started in a separate process for the run.
+
+    python -m benchmarks.signer_load [--socket PATH] [--concurrency N] [--requests N] [--duplicates FRACTION]
+"""
+from argparse import ArgumentParser
+import asyncio
+from multiprocessing import get_context
+import os
+from random import Random
+from secrets import randbits
+from tempfile import TemporaryDirectory
+from time import (
+    perf_counter,
+    sleep,
+)
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+
+from signer import (
+    SignerClient,
+    run_service,
+)
+from utils.bls import bls_priv_to_pub
+
+
+def serve_random_keys(socket_path: str, num_keys: int, num_workers: Optional[int], max_batch: int,
+                      batch_delay: float) -> None:
+    sks = [randbits(250) for _ in range(num_keys)]
+    secrets = {bls_priv_to_pub(sk): sk for sk in sks}
+    asyncio.run(run_service(secrets, socket_path, num_workers=num_workers, max_batch=max_batch,
+                            batch_delay=batch_delay))
+
+
+async def generate_load(socket_path: str, concurrency: int, requests: int,
+                        duplicates: float) -> Dict[str, Any]:
+    async with SignerClient(socket_path) as client:
+        pubkeys = await client.pubkeys()
+        random = Random(0)
+        messages = [random.randbytes(32) for _ in range(requests)]
+        shared_message = random.randbytes(32)
+        latencies: List[float] = []
+        remaining = iter(range(requests))
+
+        async def caller() -> None:
+            for i in remaining:
+                if random.random() < duplicates:
+                    pubkey, message = pubkeys[0], shared_message
+                else:
+                    pubkey, message = pubkeys[i % len(pubkeys)], messages[i]
+                start = perf_counter()
+                await client.sign(pubkey, message)
+                latencies.append(perf_counter() - start)
+
+        start = perf_counter()
+        await asyncio.gather(*[caller() for _ in range(concurrency)])
+        elapsed = perf_counter() - start
+        latencies.sort()
+        return {
+            'elapsed_seconds': elapsed,
+            'requests_per_second': requests / elapsed,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[min(int(0.99 * len(latencies)), len(latencies) - 1)] * 1000,
+            'service': await client.stats(),
+        }
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Generate load on the signing service')
+    parser.add_argument('--socket', type=str, default=None, help='Socket of a running service')
+    parser.add_argument('--num_keys', type=int, default=8)
+    parser.add_argument('--num_workers', type=int, default=None)
+    parser.add_argument('--max_batch', type=int, default=64)
+    parser.add_argument('--batch_delay', type=float, default=0.002)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--duplicates', type=float, default=0.0, help='Fraction of requests signing one shared message')  # noqa: E501
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as folder:
+        socket_path = args.socket
+        service = None
+        if socket_path is None:
+            socket_path = os.path.join(folder, 'signer.sock')
+            service = get_context('spawn').Process(target=serve_random_keys, args=(
+                socket_path, args.num_keys, args.num_workers, args.max_batch, args.batch_delay))
+            service.start()
+            while not os.path.exists(socket_path):
+                sleep(0.05)
+        try:
+            results = asyncio.run(generate_load(socket_path, args.concurrency, args.requests, args.duplicates))
+        finally:
+            if service is not None:
+                service.terminate()
+                service.join()
+    print('%d requests in %.2fs: %.1f requests/s, p50 %.1f ms, p99 %.1f ms' % (
+        args.requests, results['elapsed_seconds'], results['requests_per_second'], results['p50_ms'],
+        results['p99_ms']))
+    stats = results['service']
+    print('service: %d signatures in %d batches (mean %.1f), %d coalesced, %d errors' % (
+        stats['signatures'], stats['batches'], stats['mean_batch_size'], stats['coalesced'], stats['errors']))
+
+
+if __name__ == '__main__':
+    main()
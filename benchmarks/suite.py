@@ -0,0 +1,263 @@
+"""
+End-to-end benchmark suite: throughput, latency percentiles and peak RSS of each primitive and of the full
+``deposit.main`` flow, compared against the committed ``benchmarks/baseline.json``.
+
+    python -m benchmarks.suite [--cases NAME ...] [--output FILE] [--threshold FRACTION] [--save_baseline]
+
+Each case runs in a fresh interpreter so that its peak RSS is its own. A case regresses when its ops/sec falls
+more than ``--threshold`` below the baseline, and the suite then exits with status 1. The baseline is specific
+to the host it was recorded on, so record a new one with ``--save_baseline`` when the hardware changes: cases
+recorded with another CPU count are not compared. The end-to-end ``deposit_main`` cases depend on the host's cores
+and process start-up more than on the code, so they are reported for information and never fail the suite.
+"""
+from argparse import (
+    SUPPRESS,
+    ArgumentParser,
+)
+import builtins
+from contextlib import redirect_stdout
+import json
+import os
+import resource
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Tuple,
+)
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEPOSIT_MAIN_SIZES = (1, 4)
+INFORMATIONAL_CASES = frozenset('deposit_main_%s' % n for n in DEPOSIT_MAIN_SIZES)
+IMPORTED_MODULES = ('deposit', 'keystores')
+TEST_MNEMONIC = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+Case = Tuple[Callable[[], Any], int]  # (operation, rounds)
+
+
+def _get_seed() -> Case:
+    from key_derivation.mnemonic import get_seed
+    return lambda: get_seed(mnemonic=TEST_MNEMONIC, password=''), 200
+
+
+def _derive_child_SK() -> Case:
+    from key_derivation.tree import derive_child_SK
+    return lambda: derive_child_SK(parent_SK=2**255 - 19, index=0), 200
+
+
+def _parent_SK_to_lamport_PK() -> Case:
+    from key_derivation.tree import parent_SK_to_lamport_PK
+    return lambda: parent_SK_to_lamport_PK(parent_SK=2**255 - 19, index=0), 200
+
+
+def _keystore_case(keystore_name: str, operation: str) -> Callable[[], Case]:
+    def case() -> Case:
+        import keystores
+        keystore_cls = getattr(keystores, keystore_name)
+        kwargs = {'secret': bytes(range(32)), 'password': 'benchmark', 'pubkey': bytes(48)}
+        if operation == 'encrypt':
+            return lambda: keystore_cls.encrypt(**kwargs), 3
+        keystore = keystore_cls.encrypt(**kwargs)
+        return lambda: keystore.decrypt('benchmark'), 3
+    return case
+
+
+def _bls_sign() -> Case:
+    from utils.bls import bls_sign
+    return lambda: bls_sign(2**250, bytes(32)), 5
+
+
+def _bls_priv_to_pub() -> Case:
+    from utils.bls import bls_priv_to_pub
+    return lambda: bls_priv_to_pub(2**250), 200
+
+
+def _deposit_data_hash_tree_root() -> Case:
+    from utils.containers import DepositData
+    deposit = DepositData(pubkey=bytes(48), withdrawal_credentials=bytes(32), amount=32 * 10**9,
+                          signature=bytes(96))
+    return lambda: DepositData(**deposit.as_dict()).hash_tree_root, 200
+
+
+def _deposit_roots() -> Case:
+    from utils.deposit_roots import DepositRoots
+
+    def roots() -> bytes:
+        deposit_roots = DepositRoots(bytes(48), bytes(32), 32 * 10**9)
+        deposit_roots.signing_root()
+        return deposit_roots.data_root(bytes(96))
+    return roots, 2000
+
+
+def _merkle_root() -> Case:
+    from utils.merkle_minimal import get_merkle_root
+    leaves = [i.to_bytes(32, 'big') for i in range(256)]
+    return lambda: get_merkle_root(leaves, pad_to=len(leaves)), 1000
+
+
+def _merkle_accumulator() -> Case:
+    from utils.merkle_minimal import MerkleAccumulator
+    accumulator = MerkleAccumulator()
+    leaves = iter(range(2**32))
+
+    def append_and_root() -> bytes:
+        accumulator.append(next(leaves).to_bytes(32, 'big'))
+        return accumulator.get_deposit_root()
+    return append_and_root, 1000
+
+
+def _deposit_main(num_validators: int) -> Callable[[], Case]:
+    def case() -> Case:
+        import deposit
+
+        def run() -> None:
+            with TemporaryDirectory() as folder:
+                argv = ['deposit.py', '--num_validators', str(num_validators), '--folder', folder, '--num_workers', '1']
+                sys.argv, input_ = argv, builtins.input
+                builtins.input = lambda prompt='': 'benchmarkpassword'  # type: ignore
+                try:
+                    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                        deposit.main()
+                finally:
+                    builtins.input = input_
+        return run, 3
+    return case
+
+
+def _import(module: str) -> Callable[[], Case]:
+    def case() -> Case:
+        command = [sys.executable, '-c', 'import %s' % module]
+        return lambda: subprocess.run(command, check=True), 5
+    return case
+
+
+CASES: Dict[str, Callable[[], Case]] = {
+    'get_seed': _get_seed,
+    'derive_child_SK': _derive_child_SK,
+    'parent_SK_to_lamport_PK': _parent_SK_to_lamport_PK,
+    'keystore_encrypt_scrypt': _keystore_case('ScryptKeystore', 'encrypt'),
+    'keystore_decrypt_scrypt': _keystore_case('ScryptKeystore', 'decrypt'),
+    'keystore_encrypt_pbkdf2': _keystore_case('Pbkdf2Keystore', 'encrypt'),
+    'keystore_decrypt_pbkdf2': _keystore_case('Pbkdf2Keystore', 'decrypt'),
+    'bls_sign': _bls_sign,
+    'bls_priv_to_pub': _bls_priv_to_pub,
+    'deposit_data_hash_tree_root': _deposit_data_hash_tree_root,
+    'deposit_roots': _deposit_roots,
+    'merkle_root_256': _merkle_root,
+    'merkle_accumulator_append': _merkle_accumulator,
+}
+CASES.update({'deposit_main_%s' % n: _deposit_main(n) for n in DEPOSIT_MAIN_SIZES})
+CASES.update({'import_%s' % module: _import(module) for module in IMPORTED_MODULES})
+
+
+def percentile(latencies: List[float], fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def peak_rss() -> int:
+    """
+    Return the peak resident set size, in bytes, of this process and of its reaped children.
+    """
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, children_rss) * 1024
+
+
+def run_case(name: str) -> Dict[str, Any]:
+    operation, rounds = CASES[name]()
+    operation()  # Warm up caches and lazy imports
+    latencies = []
+    for _ in range(rounds):
+        start = perf_counter()
+        operation()
+        latencies.append(perf_counter() - start)
+    return {
+        'ops_per_sec': rounds / sum(latencies),
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_bytes': peak_rss(),
+        'rounds': rounds,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_case_in_subprocess(name: str) -> Dict[str, Any]:
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--run_case', name],
+                            check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[str]:
+    """
+    Return the names of the cases whose ops/sec is more than ``threshold`` (a fraction) below the baseline, leaving
+    out the informational cases and those recorded with another CPU count.
+    """
+    return [name for name, result in results.items()
+            if name in baseline and name not in INFORMATIONAL_CASES and
+            baseline[name].get('cpu_count') == result['cpu_count'] and
+            result['ops_per_sec'] < baseline[name]['ops_per_sec'] * (1 - threshold)]
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--output', type=str, default=None, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=0.3, help='Tolerated ops/sec drop against the baseline')
+    parser.add_argument('--save_baseline', action='store_true', help='Record the results as the new baseline')
+    parser.add_argument('--run_case', type=str, default=None, help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case is not None:
+        print(json.dumps(run_case(args.run_case)))
+        return
+
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    results = {}
+    skipped: List[str] = []
+    for name in args.cases:
+        results[name] = result = run_case_in_subprocess(name)
+        change = ''
+        if name in baseline:
+            change = '%+7.1f%%' % (100 * (result['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1))
+            if baseline[name].get('cpu_count') != result['cpu_count']:
+                change += ' (skipped: baseline recorded on %s CPUs)' % baseline[name].get('cpu_count', 'unknown')
+                skipped.append(name)
+        else:
+            change = '(no baseline)'
+        if name in INFORMATIONAL_CASES:
+            change += ' (informational)'
+        print('%-28s %10.2f ops/s  p50 %9.2f ms  p99 %9.2f ms  rss %7.1f MiB  %s' % (
+            name, result['ops_per_sec'], result['p50_ms'], result['p99_ms'], result['peak_rss_bytes'] / 2**20,
+            change))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return
+    if skipped:
+        print('Not compared, as the baseline was recorded with another CPU count (%s here): %s' % (
+            os.cpu_count(), ', '.join(skipped)))
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print('Regressed by more than %.0f%%: %s' % (100 * args.threshold, ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+from argparse import ArgumentParser
+from functools import partial
+from glob import glob
+from multiprocessing import get_context
+import os
+import sys
+from time import perf_counter
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+)
+from uuid import uuid4
+
+from keystores import (
+    Keystore,
+    Pbkdf2Keystore,
+    ScryptKeystore,
+)
+from utils.crypto import (
+    PBKDF2,
+    scrypt,
+)
+from utils.parallel import (
+    imap_bounded,
+    worker_count,
+)
+
+KdfKey = Tuple[str, str, Tuple[Tuple[str, Any], ...]]  # (password, kdf function, kdf params including the salt)
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : check or re-encrypt a folder of keystores')
+    parser.add_argument('folder', type=str, help='Folder of keystore files')
+    parser.add_argument('--output_folder', default=None, type=str, help='Re-encrypt the keystores under a new password into this folder')  # noqa: E501
+    parser.add_argument('--num_workers', type=int, default=None, help='Number of worker processes for the KDFs. (Defaults to the CPU count, capped by available memory)')  # noqa: E501
+
+    args = parser.parse_args()
+    return args
+
+
+def kdf_key(keystore: Keystore, password: str) -> KdfKey:
+    kdf = keystore.crypto.kdf
+    return password, kdf.function, tuple(sorted(kdf.params.items()))
+
+
+def _run_kdf(key: KdfKey) -> bytes:
+    password, function, params = key
+    return scrypt(password=password, **dict(params)) if 'scrypt' in function else PBKDF2(password=password, **dict(params))  # noqa: E501
+
+
+class KdfCache:
+    """
+    Decryption keys derived so far, keyed by the password, KDF function and KDF params (including the salt),
+    so keystores that share all of them only pay for the KDF once.
+    """
+    def __init__(self) -> None:
+        self.keys: Dict[KdfKey, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def derive(self, keystores: Iterable[Keystore], password: str, num_workers: Optional[int]=None) -> None:
+        """
+        Derive the decryption keys of ``keystores`` that are not cached yet, each distinct one once, over a
+        process pool sized so the KDF memory of every worker fits in the available memory.
+        """
+        missing: Dict[KdfKey, int] = {}
+        for keystore in keystores:
+            key = kdf_key(keystore, password)
+            if key in self.keys or key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = keystore.kdf_memory()
+        if not missing:
+            return
+        workers = worker_count(memory_per_task=max(missing.values()), max_workers=num_workers)
+        workers = min(workers, len(missing))
+        for key, decryption_key in imap_bounded(_run_kdf, missing, num_workers=workers, mp_context=get_context('spawn')):  # noqa: E501
+            self.keys[key] = decryption_key
+
+    def __getitem__(self, key: KdfKey) -> bytes:
+        return self.keys[key]
+
+
+def load_keystores(folder: str) -> Dict[str, Keystore]:
+    """
+    Return the keystores in ``folder`` by file name, skipping JSON files that are not keystores.
+    """
+    keystores = {}
+    for file in sorted(glob(os.path.join(folder, '*.json'))):
+        try:
+            keystores[os.path.basename(file)] = Keystore.open(file)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return keystores
+
+
+def decrypt_keystores(keystores: Dict[str, Keystore], password: str, cache: Optional[KdfCache]=None,
+                      num_workers: Optional[int]=None, timings: Optional[Dict[str, float]]=None) -> Dict[str, bytes]:
+    """
+    Decrypt every keystore with ``password``, returning the secrets by file name. Raises ``ValueError``
+    naming the keystores the password does not open.
+    """
+    cache = cache if cache is not None else KdfCache()
+    timings = timings if timings is not None else {}
+    start = perf_counter()
+    cache.derive(keystores.values(), password, num_workers=num_workers)
+    timings['kdf'] = perf_counter() - start
+
+    start = perf_counter()
+    secrets, failed = {}, []
+    for file, keystore in keystores.items():
+        try:
+            secrets[file] = keystore.decrypt(password, decryption_key=cache[kdf_key(keystore, password)])
+        except AssertionError:
+            failed.append(file)
+    timings['decrypt'] = perf_counter() - start
+    if failed:
+        raise ValueError('The password does not open %s.' % ', '.join(failed))
+    return secrets
+
+
+def _reencrypt(kwargs: Dict[str, Any], password: str) -> Keystore:
+    kwargs = dict(kwargs)
+    keystore_cls = ScryptKeystore if 'scrypt' in kwargs.pop('kdf_function') else Pbkdf2Keystore
+    return keystore_cls.encrypt(password=password, **kwargs)
+
+
+def reencrypt_keystores(keystores: Dict[str, Keystore], secrets: Dict[str, bytes], password: str,
+                        num_workers: Optional[int]=None,
+                        timings: Optional[Dict[str, float]]=None) -> Dict[str, Keystore]:
+    """
+    Encrypt each secret under ``password`` with the KDF function and params of its original keystore,
+    but a fresh salt, IV and uuid, returning the new keystores by file name.
+    """
+    timings = timings if timings is not None else {}
+    start = perf_counter()
+    encrypt_args = []
+    for file, keystore in keystores.items():
+        kdf_params = {name: value for name, value in keystore.crypto.kdf.params.items() if name != 'salt'}
+        encrypt_args.append({
+            'secret': secrets[file],
+            'path': keystore.path,
+            'pubkey': bytes.fromhex(keystore.pubkey),
+            'kdf_function': keystore.crypto.kdf.function,
+            'kdf_params': kdf_params,
+        })
+    memory = max((keystore.kdf_memory() for keystore in keystores.values()), default=0)
+    workers = min(worker_count(memory_per_task=memory, max_workers=num_workers), max(len(encrypt_args), 1))
+    reencrypted = {}
+    encrypted = imap_bounded(partial(_reencrypt, password=password), encrypt_args, num_workers=workers,
+                             mp_context=get_context('spawn'))
+    for file, (_, keystore) in zip(keystores, encrypted):
+        keystore.uuid = str(uuid4())
+        reencrypted[file] = keystore
+    timings['encrypt'] = perf_counter() - start
+    return reencrypted
+
+
+def print_timings(timings: Dict[str, float], count: int) -> None:
+    for phase, elapsed in timings.items():
+        print('%-8s %8.2fs %10.2f keystores/s' % (phase, elapsed, count / elapsed if elapsed else 0))
+
+
+def main():
+    args = get_args()
+    timings: Dict[str, float] = {}
+    start = perf_counter()
+    keystores = load_keystores(args.folder)
+    timings['load'] = perf_counter() - start
+    if not keystores:
+        print('No keystores found in %s.' % args.folder)
+        sys.exit(1)
+
+    password = input('Enter the password of the keystores in %s.' % args.folder)
+    cache = KdfCache()
+    try:
+        secrets = decrypt_keystores(keystores, password, cache=cache, num_workers=args.num_workers, timings=timings)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print('Decrypted %s keystores with %s distinct KDF runs.' % (len(secrets), cache.misses))
+
+    if args.output_folder is not None:
+        assert os.path.abspath(args.output_folder) != os.path.abspath(args.folder)
+        new_password = input('Enter the new password of the keystores.')
+        reencrypted = reencrypt_keystores(keystores, secrets, new_password, num_workers=args.num_workers,
+                                          timings=timings)
+        start = perf_counter()
+        os.makedirs(args.output_folder, exist_ok=True)
+        for file, keystore in reencrypted.items():
+            keystore.save(os.path.join(args.output_folder, file))
+        timings['write'] = perf_counter() - start
+        print('Re-encrypted %s keystores into %s.' % (len(reencrypted), args.output_folder))
+    print_timings(timings, len(keystores))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import json
+import os
+from typing import (
+    Any,
+    Dict,
+    IO,
+    Iterable,
+    Optional,
+)
+
+from utils.crypto import SHA256
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of the validators whose keystores and deposit data entry have been written,
+    recording the validator's pubkeys, the SHA256 of each keystore file and the deposit data entry itself.
+    """
+    def __init__(self, file: str, resume: bool=False) -> None:
+        self.file = file
+        self.resume = resume
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self._f: Optional[IO[str]] = None
+        if resume and os.path.exists(file):
+            with open(file, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by an interruption
+                    self.records[record['index']] = record
+
+    def __enter__(self) -> 'CheckpointJournal':
+        if self.resume and os.path.exists(self.file):
+            # Drop a last line cut short by an interruption, so that the next record starts on its own line
+            with open(self.file, 'r+b') as f:
+                f.truncate(f.read().rfind(b'\n') + 1)
+        self._f = open(self.file, 'a' if self.resume else 'w')
+        return self
+
+    def __exit__(self, *args) -> None:
+        assert self._f is not None
+        self._f.close()
+
+    def is_complete(self, index: int, pubkeys: Dict[str, bytes], cred_types: Iterable[str], folder: str='./') -> bool:
+        """
+        Return whether validator ``index`` was completed with unchanged keystore files for every one of
+        ``cred_types``. Raises ``ValueError`` if the recorded artifacts do not match the signing and withdrawal
+        ``pubkeys`` derived from the mnemonic.
+        """
+        record = self.records.get(index)
+        if record is None:
+            return False
+        deposit_data = record['deposit_data']
+        if (record['pubkeys'] != {cred_type: pubkey.hex() for cred_type, pubkey in pubkeys.items()} or
+                deposit_data['pubkey'] != pubkeys['signing'].hex() or
+                deposit_data['withdrawal_credentials'] != SHA256(pubkeys['withdrawal']).hex()):
+            raise ValueError('Validator %s in %s does not match the mnemonic.' % (index, self.file))
+        for cred_type in cred_types:
+            keystore = record['keystores'].get(cred_type)
+            if keystore is None:
+                return False
+            try:
+                with open(os.path.join(folder, keystore['file']), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                return False
+            if SHA256(content).hex() != keystore['sha256']:
+                return False
+            if json.loads(content)['pubkey'] != pubkeys[cred_type].hex():
+                raise ValueError('Keystore %s does not match the mnemonic.' % keystore['file'])
+        return True
+
+    def record(self, index: int, pubkeys: Dict[str, bytes], keystore_files: Dict[str, str],
+               deposit_data_dict: Dict[str, Any], folder: str='./') -> None:
+        assert self._f is not None
+        keystores = {}
+        for cred_type, file in keystore_files.items():
+            with open(os.path.join(folder, file), 'rb') as f:
+                keystores[cred_type] = {'file': file, 'sha256': SHA256(f.read()).hex()}
+        record = {
+            'index': index,
+            'pubkeys': {cred_type: pubkey.hex() for cred_type, pubkey in pubkeys.items()},
+            'keystores': keystores,
+            'deposit_data': deposit_data_dict,
+        }
+        line = json.dumps(record, default=lambda x: x.hex())
+        self._f.write(line + '\n')
+        self._f.flush()
+        self.records[index] = json.loads(line)
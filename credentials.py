@@ -0,0 +1,133 @@
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from key_derivation.engine import DerivationEngine
+from utils.bls import bls_priv_to_pub
+from utils.constants import (
+    COIN_TYPE,
+    PURPOSE,
+)
+from utils.crypto import SHA256
+from utils.instrumentation import timer
+
+CRED_TYPES = ('signing', 'withdrawal')
+MAX_DEPOSIT_AMOUNT = 32 * 10**9
+
+
+def validator_nodes(index: int, cred_type: str) -> Tuple[int, ...]:
+    """
+    Return the EIP-2334 path of validator ``index``'s ``cred_type`` key as a tuple of indices.
+    """
+    withdrawal_nodes = (PURPOSE, COIN_TYPE, index, 0)
+    return withdrawal_nodes + (0,) if cred_type == 'signing' else withdrawal_nodes
+
+
+def format_path(nodes: Sequence[int]) -> str:
+    return '/'.join(['m'] + [str(node) for node in nodes])
+
+
+_KEY_SLOTS = {'signing': 0, 'withdrawal': 1}
+
+
+class Credential:
+    """
+    The signing and withdrawal keys of one validator. Both SKs share a single 64-byte buffer that ``wipe`` zeroes,
+    both pubkeys a single 96-byte buffer filled in as they are first used (an all-zero pubkey is not a valid
+    compressed point, so it marks one not computed yet), and paths are only formatted by ``path``.
+    """
+    __slots__ = ('index', 'amount', '_sks', '_pubkeys', '_withdrawal_credentials')
+
+    def __init__(self, index: int, signing_sk: int, withdrawal_sk: int, amount: int=MAX_DEPOSIT_AMOUNT) -> None:
+        self.index = index
+        self.amount = amount
+        self._sks = bytearray(signing_sk.to_bytes(32, 'big') + withdrawal_sk.to_bytes(32, 'big'))
+        self._pubkeys = bytearray(96)
+        self._withdrawal_credentials: Optional[bytes] = None
+
+    def __repr__(self) -> str:
+        return 'Credential(index=%s)' % self.index
+
+    def sk(self, cred_type: str) -> bytes:
+        offset = 32 * _KEY_SLOTS[cred_type]
+        return bytes(self._sks[offset:offset + 32])
+
+    def sk_int(self, cred_type: str) -> int:
+        return int.from_bytes(self.sk(cred_type), 'big')
+
+    def nodes(self, cred_type: str) -> Tuple[int, ...]:
+        return validator_nodes(self.index, cred_type)
+
+    def path(self, cred_type: str) -> str:
+        return format_path(self.nodes(cred_type))
+
+    def cached_pubkey(self, cred_type: str) -> Optional[bytes]:
+        offset = 48 * _KEY_SLOTS[cred_type]
+        pubkey = bytes(self._pubkeys[offset:offset + 48])
+        return pubkey if any(pubkey) else None
+
+    def set_pubkey(self, cred_type: str, pubkey: bytes) -> None:
+        assert len(pubkey) == 48
+        offset = 48 * _KEY_SLOTS[cred_type]
+        self._pubkeys[offset:offset + 48] = pubkey
+
+    def pubkey(self, cred_type: str) -> bytes:
+        pubkey = self.cached_pubkey(cred_type)
+        if pubkey is None:
+            pubkey = bytes(bls_priv_to_pub(self.sk_int(cred_type)))
+            self.set_pubkey(cred_type, pubkey)
+        return pubkey
+
+    def pubkeys(self) -> Dict[str, bytes]:
+        return {cred_type: self.pubkey(cred_type) for cred_type in CRED_TYPES}
+
+    @property
+    def withdrawal_credentials(self) -> bytes:
+        if self._withdrawal_credentials is None:
+            self._withdrawal_credentials = SHA256(self.pubkey('withdrawal'))
+        return self._withdrawal_credentials
+
+    def wipe(self) -> None:
+        self._sks[:] = bytes(64)
+
+
+def iter_credentials(engine: DerivationEngine, indices: Iterable[int]) -> Iterator[Credential]:
+    for i in indices:
+        nodes = [validator_nodes(i, 'withdrawal'), validator_nodes(i, 'signing')]
+        with timer('stage.derive'):
+            withdrawal_sk, signing_sk = engine.derive_many(nodes)
+        yield Credential(i, signing_sk=signing_sk, withdrawal_sk=withdrawal_sk)
+
+
+class CredentialSet:
+    """
+    The credentials of a contiguous range of validators.
+    """
+    __slots__ = ('credentials',)
+
+    def __init__(self, credentials: Iterable[Credential]) -> None:
+        self.credentials: List[Credential] = list(credentials)
+
+    @classmethod
+    def derive(cls, mnemonic: str, password: str, num_validators: int, start_index: int=0) -> 'CredentialSet':
+        with DerivationEngine(mnemonic=mnemonic, password=password) as engine:
+            return cls(iter_credentials(engine, range(start_index, start_index + num_validators)))
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def __iter__(self) -> Iterator[Credential]:
+        return iter(self.credentials)
+
+    def __getitem__(self, i: int) -> Credential:
+        return self.credentials[i]
+
+    def wipe(self) -> None:
+        for credential in self.credentials:
+            credential.wipe()
@@ -1,26 +1,58 @@
 from argparse import ArgumentParser
+from collections import deque
+from contextlib import nullcontext
+from functools import partial
+from multiprocessing import get_context
 from typing import (
+    Any,
+    Deque,
+    IO,
+    Iterable,
+    Iterator,
     List,
-    Union,
+    Optional,
+    Tuple,
+    Type,
     Dict,
 )
-from ssz import (
-    Serializable,
-    bytes32,
-    bytes48,
-    bytes96,
-    uint64,
-)
 import json
+import os
+from time import (
+    perf_counter,
+    time,
+)
 
+from checkpoint import CheckpointJournal
+from credentials import (
+    Credential,
+    CredentialSet,
+    iter_credentials,
+)
+from deposit_ssz import (
+    SUFFIX as SSZ_SUFFIX,
+    SszDepositData,
+    SszDepositDataWriter,
+)
+from shards import (
+    parse_shard,
+    save_manifest,
+    shard_range,
+)
 from key_derivation.mnemonic import get_mnemonic
-from key_derivation.path import mnemonic_and_path_to_key
-from keystores import ScryptKeystore
-from utils.bls import (
-    bls_sign,
-    bls_priv_to_pub,
+from key_derivation.engine import DerivationEngine
+from keystores import (
+    Keystore,
+    ScryptKeystore,
+    load_kdf_profile,
+)
+from utils.bls import bls_sign
+from utils.deposit_roots import DepositRoots
+from utils import instrumentation
+from utils.parallel import (
+    imap_bounded,
+    worker_count,
 )
-from utils.crypto import SHA256
+from utils.pipeline import staged
 
 
 def get_args():
@@ -28,6 +60,19 @@ def get_args():
     parser.add_argument('--num_validators', type=int, required=True, help='Number of Eth2 validator instances to create. (Each requires a 32 Eth deposit)')  # noqa: E501
     parser.add_argument('--mnemonic_pwd', default='', type=str, help='Add an additional security to your mnemonic by using a password. (Not reccomended)')  # noqa: E501
     parser.add_argument('--save_withdrawal_keys', action='store_true', help='Saves withdrawal keys as keystores')  # noqa: E501
+    parser.add_argument('--num_workers', type=int, default=None, help='Maximum number of processes used to encrypt keystores and sign deposits. (Defaults to the number of CPUs, limited by available memory for keystores)')  # noqa: E501
+    parser.add_argument('--queue_size', type=int, default=8, help='Number of validators buffered between generation stages')  # noqa: E501
+    parser.add_argument('--start_index', type=int, default=0, help='Index of the first validator to generate, to add validators to an existing mnemonic')  # noqa: E501
+    parser.add_argument('--resume', action='store_true', help='Resume an interrupted run, skipping the validators recorded in the checkpoint file')  # noqa: E501
+    parser.add_argument('--checkpoint_file', default=None, type=str, help='Journal of the validators completed so far. (Defaults to deposit_checkpoint.jsonl in the output folder)')  # noqa: E501
+    parser.add_argument('--shard', default=None, type=parse_shard, help='Only generate shard k/N (0 <= k < N) of the validators, to be combined with merge.py')  # noqa: E501
+    parser.add_argument('--folder', default='./', type=str, help='Folder to write keystores and deposit data to')  # noqa: E501
+    parser.add_argument('--deposit_file', default=None, type=str, help='Deposit data file. (Defaults to deposit_data.json in the output folder)')  # noqa: E501
+    parser.add_argument('--deposit_format', default='json', choices=('json', 'ssz'), help='Format of the default deposit data file. (A --deposit_file ending in .ssz is always binary)')  # noqa: E501
+    parser.add_argument('--kdf_profile', default=None, type=str, help='Encrypt keystores with the KDF params of this profile from kdf_calibration.py')  # noqa: E501
+    parser.add_argument('--allow_weak_kdf', action='store_true', help='Accept a --kdf_profile below the default scrypt n and PBKDF2 c of keystores')  # noqa: E501
+    parser.add_argument('--profile', action='store_true', help='Print the time spent in each generation stage and primitive')  # noqa: E501
+    parser.add_argument('--profile_file', default=None, type=str, help='Also write the profile to this JSON trace file (implies --profile)')  # noqa: E501
 
     args = parser.parse_args()
     return args
@@ -41,80 +86,302 @@ def generate_mnemonic() -> str:
     return mnemonic
 
 
-def calculate_credentials(mnemonic: str, password: str, num_validators: int) -> List[Dict[str, Union[int, str]]]:
-    credentials = [{
-        'withdrawal_path': 'm/12381/3600/%s/0' % i,
-        'withdrawal_sk': mnemonic_and_path_to_key(mnemonic, password, 'm/12381/3600/%s/0' % i),
-        'signing_path': 'm/12381/3600/%s/0/0' % i,
-        'signing_sk': mnemonic_and_path_to_key(mnemonic, password, 'm/12381/3600/%s/0/0' % i),
-        'amount': 32 * 10**9,
-    } for i in range(num_validators)]
-    return credentials
+def enter_mnemonic() -> str:
+    return input('Enter the mnemonic of the validators you are adding to, resuming or sharding.').strip()
 
 
-def save_keystores(credentials: List[Dict[str, Union[int, str]]], folder: str='./', save_withdrawal_keys: bool=False):
-    def save_credentials(cred_type: 'str'):
+def get_password(cred_type: str) -> str:
+    password = input('Enter the password that secures your %s keys.' % cred_type)
+    confirm_password = input('Type your password again to confirm.')
+    while password != confirm_password:
+        print("\n Your passwords didn't match, please try again.\n")
         password = input('Enter the password that secures your %s keys.' % cred_type)
         confirm_password = input('Type your password again to confirm.')
-        while password != confirm_password:
-            print("\n Your passwords didn't match, please try again.\n")
-            password = input('Enter the password that secures your %s keys.' % cred_type)
-            confirm_password = input('Type your password again to confirm.')
-        for credential in credentials:
-            keystore = ScryptKeystore.encrypt(secret=int(credential['%s_sk' % cred_type]).to_bytes(32, 'big'),
-                                              password=password, path=str(credential['%s_path' % cred_type]))
-            keystore.save(folder + '%s-keystore-%s.json' % (cred_type, keystore.path.replace('/', '_')))
-
-    save_credentials('signing')
-    if save_withdrawal_keys:
-        save_credentials('withdrawal')
-
-
-class DepositMessage(Serializable):
-    fields = [
-        ('pubkey', bytes48),
-        ('withdrawal_credentials', bytes32),
-        ('amount', uint64),
-    ]
-
-
-class DepositData(Serializable):
-    fields = [
-        ('pubkey', bytes48),
-        ('withdrawal_credentials', bytes32),
-        ('amount', uint64),
-        ('signature', bytes96)
-    ]
-
-
-def save_deposit_data(credentials: List[Dict[str, Union[int, str]]], file: str='./deposit_data.json'):
-    deposit_data = list()
-    for credential in credentials:
-        deposit_message = DepositMessage(
-            pubkey=bls_priv_to_pub(int(credential['signing_sk'])),
-            withdrawal_credentials=SHA256(bls_priv_to_pub(int(credential['withdrawal_sk']))),
-            amount=credential['amount'],
-        )
-
-        deposit = DepositData(
-            **deposit_message.as_dict(),
-            signature=bls_sign(int(credential['signing_sk']), deposit_message.hash_tree_root),
-        )
-        
-        deposit_data_dict = deposit.as_dict()
-        deposit_data_dict.update({'deposit_data_root':deposit.hash_tree_root})
-
-        deposit_data.append(deposit_data_dict)
-    with open(file, 'w') as f:
-        json.dump(deposit_data, f, default=lambda x: x.hex())
+    return password
+
+
+def calculate_credentials(mnemonic: str, password: str, num_validators: int, start_index: int=0) -> CredentialSet:
+    return CredentialSet.derive(mnemonic, password, num_validators, start_index=start_index)
+
+
+def save_keystore(keystore: Keystore, cred_type: str, folder: str='./') -> str:
+    filename = '%s-keystore-%s.json' % (cred_type, keystore.path.replace('/', '_'))
+    keystore.save(folder + filename)
+    return filename
+
+
+class DepositDataWriter:
+    """
+    Writes deposit data entries to ``file`` one at a time, producing the same JSON as dumping the whole list.
+    The entries go to ``file + '.tmp'``, which only replaces ``file`` once the writer exits without an exception,
+    so an interrupted run never leaves a complete-looking but truncated list behind.
+    """
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.count = 0
+        self._f: Optional[IO[str]] = None
+
+    def __enter__(self) -> 'DepositDataWriter':
+        self._f = open(self.file + '.tmp', 'w')
+        self._f.write('[')
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        assert self._f is not None
+        if exc_type is None:
+            self._f.write(']')
+        self._f.close()
+        if exc_type is None:
+            os.replace(self.file + '.tmp', self.file)
+        else:
+            os.remove(self.file + '.tmp')
+
+    def write(self, deposit_data_dict: Dict[str, Any]) -> None:
+        assert self._f is not None
+        if self.count:
+            self._f.write(', ')
+        self._f.write(json.dumps(deposit_data_dict, default=lambda x: x.hex()))
+        self._f.flush()
+        self.count += 1
+
+
+def open_deposit_data_writer(file: str) -> Any:
+    """
+    Return a ``DepositDataWriter``, or an ``SszDepositDataWriter`` if ``file`` ends in ``.ssz``.
+    """
+    return SszDepositDataWriter(file) if file.endswith(SSZ_SUFFIX) else DepositDataWriter(file)
+
+
+def iter_deposit_data(file: str, chunk_size: int=2**16) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the entries of the deposit data JSON list in ``file`` one at a time, reading ``chunk_size``
+    characters at a time rather than loading the whole file. Binary deposit data (a ``file`` ending in ``.ssz``)
+    is read through a memory mapping and yields the same entries.
+    """
+    if file.endswith(SSZ_SUFFIX):
+        with SszDepositData(file) as deposit_data:
+            yield from deposit_data
+        return
+    decoder = json.JSONDecoder()
+    with open(file, 'r') as f:
+        buffer = ''
+        expecting = '['  # then 'entry_or_end' once, then alternating 'separator' and 'entry'
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position == len(buffer):
+                    break
+                char = buffer[position]
+                if expecting == '[' or expecting == 'separator':
+                    if char == ']' and expecting == 'separator':
+                        return
+                    if char != ('[' if expecting == '[' else ','):
+                        raise ValueError('Malformed deposit data in %s at %r' % (file, buffer[position:position + 32]))
+                    position += 1
+                    expecting = 'entry_or_end' if expecting == '[' else 'entry'
+                    continue
+                if char == ']' and expecting == 'entry_or_end':
+                    return
+                try:
+                    entry, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    break  # The entry continues in the next chunk
+                yield entry
+                expecting = 'separator'
+            buffer = buffer[position:]
+            if not chunk:
+                raise ValueError('Unexpected end of deposit data in %s' % file)
+
+
+def __getattr__(name: str) -> Any:
+    # The SSZ containers are imported on first use, as ``ssz`` is slow to import.
+    if name in ('DepositMessage', 'DepositData'):
+        from utils import containers
+        return getattr(containers, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def deposit_data_from_credential(credential: Credential) -> Dict[str, Any]:
+    pubkey, withdrawal_credentials = credential.pubkey('signing'), credential.withdrawal_credentials
+    roots = DepositRoots(pubkey, withdrawal_credentials, credential.amount)
+    signature = bls_sign(credential.sk_int('signing'), roots.signing_root())
+    return {
+        'pubkey': pubkey,
+        'withdrawal_credentials': withdrawal_credentials,
+        'amount': credential.amount,
+        'signature': signature,
+        'deposit_data_root': roots.data_root(signature),
+    }
+
+
+@instrumentation.timed('stage.sign')
+def _sign_credential(credential: Credential) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+    deposit_data_dict = deposit_data_from_credential(credential)
+    return credential.pubkeys(), deposit_data_dict
+
+
+def build_deposit_data(credentials: Iterable[Credential],
+                       num_workers: Optional[int]=None) -> Iterator[Tuple[Credential, Dict[str, Any]]]:
+    """
+    Yield ``(credential, deposit_data_dict)`` for each credential, in order, with the BLS work spread over
+    a process pool. The pubkeys computed by the workers are memoized on the credentials.
+    """
+    workers = worker_count(max_workers=num_workers)
+    # Worker processes are spawned rather than forked as this may run alongside other pipeline threads.
+    for credential, (pubkeys, deposit_data_dict) in imap_bounded(_sign_credential, credentials, num_workers=workers,
+                                                                 mp_context=get_context('spawn')):
+        for cred_type, pubkey in pubkeys.items():
+            credential.set_pubkey(cred_type, pubkey)
+        yield credential, deposit_data_dict
+
+
+def save_deposit_data(credentials: Iterable[Credential], file: str='./deposit_data.json',
+                      num_workers: Optional[int]=None):
+    with open_deposit_data_writer(file) as writer:
+        for _, deposit_data_dict in build_deposit_data(credentials, num_workers=num_workers):
+            writer.write(deposit_data_dict)
+
+
+@instrumentation.timed('stage.encrypt')
+def _encrypt_credential(credential: Credential, keystore_passwords: Dict[str, str], keystore_cls: Type[Keystore],
+                        kdf_profile: Optional[Dict[str, Any]]=None) -> List[Tuple[str, Keystore]]:
+    keystores = []
+    for cred_type, password in keystore_passwords.items():
+        keystore = keystore_cls.encrypt(secret=credential.sk(cred_type), password=password,
+                                        path=credential.path(cred_type), pubkey=credential.pubkey(cred_type),
+                                        kdf_profile=kdf_profile)
+        keystores.append((cred_type, keystore))
+    return keystores
+
+
+def generate_deposits(mnemonic: str, password: str, num_validators: int, keystore_passwords: Dict[str, str],
+                      folder: str='./', file: str='./deposit_data.json', keystore_cls: Type[Keystore]=ScryptKeystore,
+                      num_workers: Optional[int]=None, queue_size: int=8, start_index: int=0,
+                      checkpoint_file: Optional[str]=None, resume: bool=False,
+                      kdf_profile: Optional[Dict[str, Any]]=None) -> None:
+    """
+    Derive, sign, encrypt and write validators ``start_index`` to ``start_index + num_validators - 1`` as a
+    pipeline whose stages run concurrently with at most ``queue_size`` validators buffered between them. The
+    keystores (one per entry of ``keystore_passwords``) and deposit data entry of each validator are written as
+    soon as they are ready, and then recorded in ``checkpoint_file``. With ``resume``, the validators recorded
+    there whose keystores are unchanged and match the mnemonic are not generated again. Keystores are encrypted
+    with the KDF params calibrated in ``kdf_profile`` if one is given. The ``num_workers`` processes (default: the
+    CPU count) are shared between the signing and encryption stages.
+    """
+    template = keystore_cls()
+    if kdf_profile is not None:
+        template.apply_kdf_profile(kdf_profile)
+    # The signing and encryption pools run at the same time, so they share the worker budget. A signature is cheap
+    # next to a keystore KDF, so signing gets a quarter of it.
+    budget = worker_count(max_workers=num_workers)
+    sign_workers = max(budget // 4, 1)
+    workers = worker_count(memory_per_task=template.kdf_memory(), max_workers=max(budget - sign_workers, 1))
+    encrypt_credential = partial(_encrypt_credential, keystore_passwords=keystore_passwords, keystore_cls=keystore_cls,
+                                 kdf_profile=kdf_profile)
+    indices = range(start_index, start_index + num_validators)
+    journal = CheckpointJournal(checkpoint_file, resume=resume) if checkpoint_file is not None else None
+    engine = DerivationEngine(mnemonic=mnemonic, password=password)  # Closed with the writer below
+
+    completed: Dict[int, Dict[str, Any]] = {}
+    if journal is not None and journal.records:
+        for credential in iter_credentials(engine, [i for i in indices if i in journal.records]):
+            index = credential.index
+            if journal.is_complete(index, credential.pubkeys(), keystore_passwords, folder):
+                completed[index] = journal.records[index]['deposit_data']
+    skipped = deque(sorted(completed))
+
+    def sign(credentials: Iterator[Credential]) -> Iterator[Tuple[Credential, Dict[str, Any]]]:
+        return build_deposit_data(credentials, num_workers=sign_workers)
+
+    def encrypt(items: Iterator[Tuple[Credential, Dict[str, Any]]]) -> Iterator[Tuple[Credential, List, Dict]]:
+        deposits: Deque[Dict[str, Any]] = deque()
+
+        def credentials() -> Iterator[Credential]:
+            for credential, deposit_data_dict in items:
+                deposits.append(deposit_data_dict)
+                yield credential
+
+        # Worker processes are spawned rather than forked as the other stages' threads are running.
+        encrypted = imap_bounded(encrypt_credential, credentials(), num_workers=workers,
+                                 mp_context=get_context('spawn'))
+        for credential, keystores in encrypted:
+            deposit_data_dict = deposits.popleft()
+            for _, keystore in keystores:
+                keystore.uuid = keystore_cls.uuid  # The default uuid is drawn at import, so use this process's one
+            yield credential, keystores, deposit_data_dict
+
+    with open_deposit_data_writer(file) as writer, (journal or nullcontext()), engine:
+        def write_skipped(until: int) -> None:
+            while skipped and skipped[0] < until:
+                writer.write(completed[skipped.popleft()])
+
+        remaining = iter_credentials(engine, [i for i in indices if i not in completed])
+        for credential, keystores, deposit_data_dict in staged(remaining, sign, encrypt, maxsize=queue_size):
+            index = credential.index
+            write_skipped(index)
+            with instrumentation.timer('stage.write'):
+                keystore_files = {cred_type: save_keystore(keystore, cred_type, folder)
+                                  for cred_type, keystore in keystores}
+                writer.write(deposit_data_dict)
+                if journal is not None:
+                    journal.record(index, credential.pubkeys(), keystore_files, deposit_data_dict, folder)
+            credential.wipe()
+            print('\rGenerated %s/%s validators.' % (writer.count, num_validators), end='', flush=True)
+        write_skipped(start_index + num_validators)
+    print()
 
 
 def main():
     args = get_args()
-    mnemonic = generate_mnemonic()
-    credentials = calculate_credentials(mnemonic, args.mnemonic_pwd, args.num_validators)
-    save_keystores(credentials, save_withdrawal_keys=args.save_withdrawal_keys)
-    save_deposit_data(credentials)
+    folder = os.path.join(args.folder, '')
+    indices = range(args.start_index, args.start_index + args.num_validators)
+    suffix = ''
+    if args.shard is not None:
+        shard, num_shards = args.shard
+        indices = shard_range(args.start_index, args.num_validators, shard, num_shards)
+        suffix = '-shard-%s-of-%s' % (shard, num_shards)
+    deposit_file = args.deposit_file or folder + 'deposit_data%s.%s' % (suffix, args.deposit_format)
+    checkpoint_file = args.checkpoint_file or folder + 'deposit_checkpoint%s.jsonl' % suffix
+
+    kdf_profile = None
+    if args.kdf_profile is not None:
+        kdf_profile = load_kdf_profile(args.kdf_profile, allow_weak=args.allow_weak_kdf)
+        if args.allow_weak_kdf:
+            print('Warning: --allow_weak_kdf may encrypt keystores with weaker KDF params than the defaults.')
+    existing_mnemonic = args.resume or args.start_index > 0 or args.shard is not None
+    mnemonic = enter_mnemonic() if existing_mnemonic else generate_mnemonic()
+    keystore_passwords = {'signing': get_password('signing')}
+    if args.save_withdrawal_keys:
+        keystore_passwords['withdrawal'] = get_password('withdrawal')
+    profile = args.profile or args.profile_file is not None
+    if profile:
+        instrumentation.enable()
+    start = perf_counter()
+    generate_deposits(mnemonic, args.mnemonic_pwd, len(indices), keystore_passwords, folder=folder, file=deposit_file,
+                      num_workers=args.num_workers, queue_size=args.queue_size, start_index=indices.start,
+                      checkpoint_file=checkpoint_file, resume=args.resume, kdf_profile=kdf_profile)
+    if args.shard is not None:
+        save_manifest(deposit_file, indices, shard, num_shards)
+    if profile:
+        save_profile(args.profile_file, perf_counter() - start, num_validators=len(indices),
+                     num_workers=args.num_workers)
+
+
+def save_profile(file: Optional[str], elapsed: float, **run_info: Any) -> None:
+    """
+    Print the instrumentation recorded during the run, and if ``file`` is given, write it there as JSON together
+    with ``run_info``. Worker time is summed over processes, so a stage can exceed 100% of the wall time.
+    """
+    profile = instrumentation.snapshot()
+    print('Generation took %.3fs:' % elapsed)
+    print(instrumentation.report(profile, elapsed))
+    if file is not None:
+        with open(file, 'w') as f:
+            json.dump({'time': time(), 'elapsed_seconds': elapsed, 'run': run_info, **profile}, f, indent=2)
 
 
 if __name__ == '__main__':
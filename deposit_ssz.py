@@ -0,0 +1,182 @@
+"""
+Binary deposit data: the SSZ serialization of a ``List[DepositData]`` (fixed-size records, so simply their
+concatenation) followed by the ``deposit_data_root`` of each record, 216 bytes per deposit in all.
+
+    python deposit_ssz.py deposit_data.json deposit_data.ssz    # and back again
+"""
+from argparse import ArgumentParser
+import mmap
+import os
+from typing import (
+    Any,
+    Dict,
+    IO,
+    Iterator,
+    Optional,
+    Union,
+)
+
+FIELDS = (  # (name, offset, size) in a serialized DepositData
+    ('pubkey', 0, 48),
+    ('withdrawal_credentials', 48, 32),
+    ('amount', 80, 8),
+    ('signature', 88, 96),
+)
+FIELD_OFFSETS = {name: (offset, size) for name, offset, size in FIELDS}
+RECORD_SIZE = 184
+ROOT_SIZE = 32
+SUFFIX = '.ssz'
+
+
+def _to_bytes(value: Union[bytes, str]) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value) if isinstance(value, str) else value
+
+
+def encode_deposit_data(deposit_data_dict: Dict[str, Any]) -> bytes:
+    """
+    Return the SSZ serialization of a deposit data entry, whose bytes fields may be given as bytes or as hex.
+    """
+    record = b''.join([
+        _to_bytes(deposit_data_dict['pubkey']),
+        _to_bytes(deposit_data_dict['withdrawal_credentials']),
+        deposit_data_dict['amount'].to_bytes(8, 'little'),
+        _to_bytes(deposit_data_dict['signature']),
+    ])
+    assert len(record) == RECORD_SIZE
+    return record
+
+
+class SszDepositDataWriter:
+    """
+    Writes deposit data entries to ``file`` one at a time, with the same interface as ``deposit.DepositDataWriter``.
+    The records are written as they come and the roots, 32 bytes per entry, are held until the file is closed.
+    As there, ``file`` is only replaced once the writer exits without an exception.
+    """
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.count = 0
+        self._roots = bytearray()
+        self._f: Optional[IO[bytes]] = None
+
+    def __enter__(self) -> 'SszDepositDataWriter':
+        self._f = open(self.file + '.tmp', 'wb')
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        assert self._f is not None
+        if exc_type is None:
+            self._f.write(self._roots)
+        self._f.close()
+        if exc_type is None:
+            os.replace(self.file + '.tmp', self.file)
+        else:
+            os.remove(self.file + '.tmp')
+
+    def write(self, deposit_data_dict: Dict[str, Any]) -> None:
+        assert self._f is not None
+        root = _to_bytes(deposit_data_dict['deposit_data_root'])
+        assert len(root) == ROOT_SIZE
+        self._f.write(encode_deposit_data(deposit_data_dict))
+        self._roots += root
+        self.count += 1
+
+
+class SszDepositData:
+    """
+    Memory-mapped binary deposit data. ``record`` and ``root`` return zero-copy views into the mapping, so entries
+    can be read at random without parsing the rest of the file. The views must be released before ``close``.
+    """
+    def __init__(self, file: str) -> None:
+        self.file = file
+        with open(file, 'rb') as f:
+            size = f.seek(0, 2)
+            if size % (RECORD_SIZE + ROOT_SIZE):
+                raise ValueError('%s is not binary deposit data, its size is %s bytes.' % (file, size))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+        self._count = size // (RECORD_SIZE + ROOT_SIZE)
+
+    def __enter__(self) -> 'SszDepositData':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('deposit data index out of range')
+        return index
+
+    def records(self) -> memoryview:
+        """
+        Return the SSZ serialization of the whole ``List[DepositData]``.
+        """
+        return self._view[:self._count * RECORD_SIZE]
+
+    def record(self, index: int) -> memoryview:
+        offset = self._check_index(index) * RECORD_SIZE
+        return self._view[offset:offset + RECORD_SIZE]
+
+    def root(self, index: int) -> memoryview:
+        offset = self._count * RECORD_SIZE + self._check_index(index) * ROOT_SIZE
+        return self._view[offset:offset + ROOT_SIZE]
+
+    def field(self, index: int, name: str) -> memoryview:
+        offset, size = FIELD_OFFSETS[name]
+        return self.record(index)[offset:offset + size]
+
+    def entry(self, index: int) -> Dict[str, Any]:
+        """
+        Return entry ``index`` as it appears in the JSON deposit data.
+        """
+        record = self.record(index)
+        entry: Dict[str, Any] = {}
+        for name, offset, size in FIELDS:
+            value = record[offset:offset + size]
+            entry[name] = int.from_bytes(value, 'little') if name == 'amount' else value.hex()
+        entry['deposit_data_root'] = self.root(index).hex()
+        return entry
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._count):
+            yield self.entry(index)
+
+
+def json_to_ssz(json_file: str, ssz_file: str) -> int:
+    from deposit import iter_deposit_data
+    with SszDepositDataWriter(ssz_file) as writer:
+        for entry in iter_deposit_data(json_file):
+            writer.write(entry)
+    return writer.count
+
+
+def ssz_to_json(ssz_file: str, json_file: str) -> int:
+    from deposit import DepositDataWriter
+    with SszDepositData(ssz_file) as deposit_data, DepositDataWriter(json_file) as writer:
+        for entry in deposit_data:
+            writer.write(entry)
+    return writer.count
+
+
+def main():
+    parser = ArgumentParser(description='🦄 : convert deposit data between JSON and binary SSZ')
+    parser.add_argument('source', help='Deposit data to convert, binary if it ends in %s' % SUFFIX)
+    parser.add_argument('destination', help='Converted deposit data file')
+    args = parser.parse_args()
+    convert = ssz_to_json if args.source.endswith(SUFFIX) else json_to_ssz
+    count = convert(args.source, args.destination)
+    print('Converted %s entries into %s.' % (count, args.destination))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Choose keystore KDF params for this host: the costliest scrypt ``n`` and PBKDF2 ``c`` that unlock a keystore within
+a target latency, with scrypt's memory under a ceiling, and never below the security floors (by default the params
+keystores use without a profile). Calibrate on the hosts that will unlock the keystores, and pass the saved profile
+to ``deposit.py --kdf_profile`` wherever they are generated. The params chosen are recorded in each keystore's
+``kdf.params`` as usual, so unlocking needs no profile.
+
+    python kdf_calibration.py [--target_ms MS] [--max_memory_mib MIB] [--output FILE]
+"""
+from argparse import ArgumentParser
+import json
+import os
+import platform
+import sys
+from time import (
+    perf_counter,
+    time,
+)
+from typing import (
+    Any,
+    Dict,
+)
+
+from keystores import (
+    KDF_PROFILE_VERSION,
+    MIN_PBKDF2_C,
+    MIN_SCRYPT_N,
+    Pbkdf2Keystore,
+    ScryptKeystore,
+)
+from utils.crypto import (
+    PBKDF2,
+    scrypt,
+)
+
+PBKDF2_C_STEP = 2**10
+_SALT = bytes(32)
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : calibrate keystore KDF params for this host')
+    parser.add_argument('--target_ms', type=float, default=1000, help='Target time to unlock one keystore, in milliseconds')  # noqa: E501
+    parser.add_argument('--max_memory_mib', type=int, default=256, help='Memory ceiling of one scrypt call, in MiB')  # noqa: E501
+    parser.add_argument('--min_scrypt_n', type=int, default=MIN_SCRYPT_N, help='Lowest scrypt n chosen, whatever the target. (Defaults to that of keystores)')  # noqa: E501
+    parser.add_argument('--min_pbkdf2_c', type=int, default=MIN_PBKDF2_C, help='Lowest PBKDF2 c chosen, whatever the target. (Defaults to that of keystores)')  # noqa: E501
+    parser.add_argument('--output', default='./kdf_profile.json', type=str, help='Profile file to write')
+
+    args = parser.parse_args()
+    return args
+
+
+def time_kdf(function: str, params: Dict[str, Any]) -> float:
+    start = perf_counter()
+    if function == 'scrypt':
+        scrypt(password='calibration', salt=_SALT, **params)
+    else:
+        PBKDF2(password='calibration', salt=_SALT, **params)
+    return perf_counter() - start
+
+
+def scrypt_memory(params: Dict[str, Any]) -> int:
+    return 128 * params['r'] * params['n'] * params['p']
+
+
+def calibrate_scrypt(target_seconds: float, max_memory: int, min_n: int=MIN_SCRYPT_N) -> Dict[str, Any]:
+    """
+    Return the largest power-of-two ``n`` (with the default ``r`` and ``p``), at least ``min_n``, whose scrypt
+    runs within ``target_seconds`` and ``max_memory`` bytes, and what it measured. Raises ``ValueError`` if
+    ``min_n`` alone exceeds ``max_memory``.
+    """
+    params = dict(ScryptKeystore().crypto.kdf.params)
+    assert min_n > 1 and min_n & (min_n - 1) == 0, 'scrypt n must be a power of two'
+    if scrypt_memory({**params, 'n': min_n}) > max_memory:
+        raise ValueError('scrypt n=%s needs %s MiB, over the %s MiB ceiling.' % (
+            min_n, scrypt_memory({**params, 'n': min_n}) >> 20, max_memory >> 20))
+    # scrypt's time is linear in n, so extrapolate from a cheap run and then check the choice.
+    probe_n = min(min_n, 2**12)
+    seconds_per_n = time_kdf('scrypt', {**params, 'n': probe_n}) / probe_n
+    n = min_n
+    while scrypt_memory({**params, 'n': 2 * n}) <= max_memory and seconds_per_n * 2 * n <= target_seconds:
+        n *= 2
+    seconds = time_kdf('scrypt', {**params, 'n': n})
+    while seconds > target_seconds and n > min_n:
+        n //= 2
+        seconds = time_kdf('scrypt', {**params, 'n': n})
+    params['n'] = n
+    return {'params': params, 'seconds': seconds, 'memory_bytes': scrypt_memory(params)}
+
+
+def calibrate_pbkdf2(target_seconds: float, min_c: int=MIN_PBKDF2_C) -> Dict[str, Any]:
+    """
+    Return the largest ``c`` (a multiple of ``PBKDF2_C_STEP``), at least ``min_c``, whose PBKDF2 runs within
+    ``target_seconds``, and what it measured.
+    """
+    params = dict(Pbkdf2Keystore().crypto.kdf.params)
+    probe_c = 2**14
+    seconds_per_c = time_kdf('pbkdf2', {**params, 'c': probe_c}) / probe_c
+    c = max(min_c, int(target_seconds / seconds_per_c) // PBKDF2_C_STEP * PBKDF2_C_STEP)
+    seconds = time_kdf('pbkdf2', {**params, 'c': c})
+    if seconds > target_seconds and c > min_c:
+        c = max(min_c, int(c * target_seconds / seconds) // PBKDF2_C_STEP * PBKDF2_C_STEP)
+        seconds = time_kdf('pbkdf2', {**params, 'c': c})
+    params['c'] = c
+    return {'params': params, 'seconds': seconds, 'memory_bytes': 0}
+
+
+def calibrate(target_seconds: float, max_memory: int, min_scrypt_n: int=MIN_SCRYPT_N,
+              min_pbkdf2_c: int=MIN_PBKDF2_C) -> Dict[str, Any]:
+    """
+    Return a KDF profile, as consumed by ``Keystore.encrypt(kdf_profile=...)``, calibrated on this host.
+    """
+    return {
+        'version': KDF_PROFILE_VERSION,
+        'host': platform.node(),
+        'time': time(),
+        'target_seconds': target_seconds,
+        'max_memory_bytes': max_memory,
+        'kdfs': {
+            'scrypt': calibrate_scrypt(target_seconds, max_memory, min_n=min_scrypt_n),
+            'pbkdf2': calibrate_pbkdf2(target_seconds, min_c=min_pbkdf2_c),
+        },
+    }
+
+
+def save_kdf_profile(file: str, profile: Dict[str, Any]) -> None:
+    tmp_file = file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_file, file)
+
+
+def main():
+    args = get_args()
+    if args.min_scrypt_n < MIN_SCRYPT_N or args.min_pbkdf2_c < MIN_PBKDF2_C:
+        print('Warning: the KDF params may be chosen below the defaults of keystores (scrypt n=%s, PBKDF2 c=%s), '
+              'and deposit.py only uses such a profile with --allow_weak_kdf.' % (MIN_SCRYPT_N, MIN_PBKDF2_C))
+    try:
+        profile = calibrate(args.target_ms / 1000, args.max_memory_mib * 2**20, min_scrypt_n=args.min_scrypt_n,
+                            min_pbkdf2_c=args.min_pbkdf2_c)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    save_kdf_profile(args.output, profile)
+    for function, calibrated in profile['kdfs'].items():
+        params = ', '.join('%s=%s' % item for item in sorted(calibrated['params'].items()))
+        print('%-7s %s: %.0f ms, %.0f MiB' % (
+            function, params, calibrated['seconds'] * 1000, calibrated['memory_bytes'] / 2**20))
+    print('Saved the KDF profile to %s.' % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+    Union,
+)
+
+from .mnemonic import get_seed
+from .path import path_to_nodes
+from .tree import (
+    derive_master_SK,
+    derive_child_SK,
+)
+
+Nodes = Tuple[int, ...]
+Path = Union[str, Nodes]  # 'm/12381/3600/0/0' or (12381, 3600, 0, 0)
+
+
+def _to_nodes(path: Path) -> Nodes:
+    return tuple(path_to_nodes(path)) if isinstance(path, str) else tuple(path)
+
+
+class DerivationEngine:
+    """
+    Derives EIP-2333 keys for many paths under a single mnemonic and mnemonic password.
+
+    The seed and master SK are computed once, intermediate node SKs are held in a bounded LRU keyed by
+    path prefix, and ``derive_many`` walks the requested paths in tree order so that each distinct node
+    is derived exactly once. Cached SKs are zeroed by ``clear``, and ``close`` (called when the engine is discarded)
+    additionally zeroes the seed and master SK.
+    """
+    def __init__(self, *, mnemonic: str, password: str, cache_size: int=1024) -> None:
+        self._init(get_seed(mnemonic=mnemonic, password=password), cache_size)
+
+    @classmethod
+    def from_seed(cls, seed: bytes, cache_size: int=1024) -> 'DerivationEngine':
+        engine = cls.__new__(cls)
+        engine._init(seed, cache_size)
+        return engine
+
+    def _init(self, seed: bytes, cache_size: int) -> None:
+        assert cache_size > 0
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Nodes, bytearray]' = OrderedDict()
+        self._seed = bytearray(seed)
+        self._master_SK = bytearray(derive_master_SK(bytes(self._seed)).to_bytes(32, 'big'))
+
+    @property
+    def master_SK(self) -> int:
+        return int.from_bytes(self._master_SK, 'big')
+
+    def __enter__(self) -> 'DerivationEngine':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        self.close()
+
+    def _lookup(self, nodes: Nodes) -> Tuple[int, int]:
+        """
+        Return the length and SK of the longest derived prefix of ``nodes``.
+        """
+        for depth in range(len(nodes), 0, -1):
+            sk = self._cache.get(nodes[:depth])
+            if sk is not None:
+                self._cache.move_to_end(nodes[:depth])
+                return depth, int.from_bytes(sk, 'big')
+        return 0, self.master_SK
+
+    def _store(self, nodes: Nodes, sk: int) -> None:
+        self._cache[nodes] = bytearray(sk.to_bytes(32, 'big'))
+        while len(self._cache) > self.cache_size:
+            _, evicted = self._cache.popitem(last=False)
+            evicted[:] = bytes(32)
+
+    def _derive_nodes(self, nodes: Nodes) -> int:
+        depth, sk = self._lookup(nodes)
+        for i in range(depth, len(nodes)):
+            sk = derive_child_SK(parent_SK=sk, index=nodes[i])
+            self._store(nodes[:i + 1], sk)
+        return sk
+
+    def derive(self, path: Path) -> int:
+        return self._derive_nodes(_to_nodes(path))
+
+    def derive_many(self, paths: Iterable[Path]) -> List[int]:
+        node_lists = [_to_nodes(path) for path in paths]
+        # Lexicographic order visits every prefix before its descendants and keeps siblings adjacent,
+        # so the nodes a path depends on are always the most recently used entries in the cache.
+        derived: Dict[Nodes, int] = {}
+        for nodes in sorted(set(node_lists)):
+            derived[nodes] = self._derive_nodes(nodes)
+        return [derived[nodes] for nodes in node_lists]
+
+    def clear(self) -> None:
+        if not hasattr(self, '_cache'):  # Construction failed before the cache was set
+            return
+        for sk in self._cache.values():
+            sk[:] = bytes(32)
+        self._cache.clear()
+
+    def close(self) -> None:
+        self.clear()
+        if hasattr(self, '_master_SK'):
+            self._seed[:] = bytes(len(self._seed))
+            self._master_SK[:] = bytes(32)
@@ -1,20 +1,121 @@
+import os
 from unicodedata import normalize
-from typing import Optional
+from hashlib import sha256 as _hashlib_sha256
+from itertools import (
+    combinations,
+    product,
+)
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from secrets import randbits
 from utils.crypto import (
     PBKDF2,
     SHA256,
 )
+from utils.instrumentation import timed
+
 
+def _load_word_list(file: str) -> Tuple[str, ...]:
+    with open(os.path.join(os.path.dirname(__file__), file), 'r') as f:
+        return tuple(f.read().split())
 
-english_word_list = open('key_derivation/english.txt').readlines()
+
+english_word_list = _load_word_list('english.txt')
+english_word_indices: Dict[str, int] = {word: index for index, word in enumerate(english_word_list)}
+assert len(english_word_list) == len(english_word_indices) == 2048
 
 
 def get_word(index: int) -> str:
     assert index < 2048
-    return english_word_list[index][:-1]
+    return english_word_list[index]
+
+
+def get_word_index(word: str) -> int:
+    """
+    Return the index of ``word`` in the wordlist, raising ``KeyError`` if it is not in it.
+    """
+    return english_word_indices[word]
+
+
+def _checksum_length(num_words: int) -> int:
+    assert num_words in range(12, 25, 3)
+    return num_words // 3
+
+
+def _indices_to_bits(word_indices: Sequence[int]) -> int:
+    bits = 0
+    for index in word_indices:
+        bits = bits << 11 | index
+    return bits
+
+
+def _checksum_is_valid(bits: int, num_words: int) -> bool:
+    """
+    Return whether the last ``num_words // 3`` of the ``num_words * 11`` mnemonic ``bits`` are the BIP-39
+    checksum of the bits before them.
+    """
+    checksum_length = _checksum_length(num_words)
+    entropy = (bits >> checksum_length).to_bytes((num_words * 11 - checksum_length) // 8, 'big')
+    return _hashlib_sha256(entropy).digest()[0] >> 8 - checksum_length == bits & 2**checksum_length - 1
+
+
+def _bits_to_mnemonic(bits: int, num_words: int) -> str:
+    return ' '.join(get_word(bits >> 11 * i & 2**11 - 1) for i in range(num_words - 1, -1, -1))
+
+
+def mnemonic_to_indices(mnemonic: str) -> List[int]:
+    """
+    Return the wordlist indices of the words of ``mnemonic``, raising ``KeyError`` for a word not in the list.
+    """
+    return [get_word_index(word) for word in normalize('NFKD', mnemonic).split()]
+
+
+def validate_mnemonic(mnemonic: str) -> bool:
+    try:
+        word_indices = mnemonic_to_indices(mnemonic)
+    except KeyError:
+        return False
+    num_words = len(word_indices)
+    return num_words in range(12, 25, 3) and _checksum_is_valid(_indices_to_bits(word_indices), num_words)
+
+
+def candidate_mnemonics(words: Sequence[Optional[str]], swaps: bool=False) -> Iterator[str]:
+    """
+    Yield the mnemonics with a valid checksum that ``words`` could be, where ``None`` stands for an unknown word
+    and, with ``swaps``, any two of the words may also have been transposed. Candidates are evaluated as integers
+    (the known words' bits are computed once and each unknown word is OR-ed into place), and only those passing
+    the checksum are turned into strings.
+    """
+    num_words = len(words)
+    _checksum_length(num_words)
+    known = [0 if word is None else get_word_index(word) for word in words]
+    shifts = [11 * (num_words - 1 - i) for i, word in enumerate(words) if word is None]
+    pairs = list(combinations(range(num_words), 2)) if swaps else []
+    base = _indices_to_bits(known)
+    seen = set()
+    for fill in product(range(2048), repeat=len(shifts)):
+        bits = base
+        for shift, index in zip(shifts, fill):
+            bits |= index << shift
+        candidates = [bits]
+        for i, j in pairs:
+            shift_i, shift_j = 11 * (num_words - 1 - i), 11 * (num_words - 1 - j)
+            word_i, word_j = bits >> shift_i & 2**11 - 1, bits >> shift_j & 2**11 - 1
+            if word_i != word_j:
+                candidates.append(bits ^ (word_i ^ word_j) << shift_i ^ (word_i ^ word_j) << shift_j)
+        for candidate in candidates:
+            if _checksum_is_valid(candidate, num_words) and candidate not in seen:
+                seen.add(candidate)
+                yield _bits_to_mnemonic(candidate, num_words)
 
 
+@timed('key_derivation.get_seed')
 def get_seed(*, mnemonic: str, password: str='') -> bytes:
     mnemonic = normalize('NFKD', mnemonic)
     salt = normalize('NFKD', 'mnemonic' + password).encode('utf-8')
@@ -16,7 +16,7 @@ def path_to_nodes(path: str) -> List[int]:
 
 
 def mnemonic_and_path_to_key(mnemonic: str, password: str, path: str) -> int:
-    seed = get_seed(mnemonic=mnemonic, password='')
+    seed = get_seed(mnemonic=mnemonic, password=password)
     sk = derive_master_SK(seed)
     for node in path_to_nodes(path):
         sk = derive_child_SK(parent_SK=sk, index=node)
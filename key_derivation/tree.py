@@ -1,9 +1,21 @@
 from utils.crypto import (
     HKDF,
+    HKDF_many,
     SHA256,
+    SHA256_chunks,
 )
-from py_ecc.optimized_bls12_381 import curve_order as bls_curve_order
-from typing import List
+from utils.instrumentation import (
+    count,
+    timed,
+)
+from typing import (
+    List,
+    Sequence,
+)
+
+LAMPORT_PKS_LENGTH = 2 * 255 * 32  # The (lamport_0 + lamport_1) public keys of a single child
+# The BLS12-381 curve order, as in ``py_ecc.optimized_bls12_381`` which is slow to import
+bls_curve_order = 0x73eda753299d7d483339d80809a1d80553bda402fffe5bfeffffffff00000001
 
 
 def flip_bits(input: int) -> int:
@@ -16,16 +28,29 @@ def IKM_to_lamport_SK(*, IKM: bytes, salt: bytes) -> List[bytes]:
     return lamport_SK
 
 
-def parent_SK_to_lamport_PK(*, parent_SK: int, index: int) -> bytes:
+def _parent_SK_to_lamport_SKs(*, parent_SK: int, index: int) -> bytes:
     salt = index.to_bytes(4, byteorder='big')
     IKM = parent_SK.to_bytes(32, byteorder='big')
-    lamport_0 = IKM_to_lamport_SK(IKM=IKM, salt=salt)
     not_IKM = flip_bits(parent_SK).to_bytes(32, byteorder='big')
-    lamport_1 = IKM_to_lamport_SK(IKM=not_IKM, salt=salt)
-    lamport_SKs = lamport_0 + lamport_1
-    lamport_PKs = [SHA256(sk) for sk in lamport_SKs]
-    compressed_PK = SHA256(b''.join(lamport_PKs))
-    return compressed_PK
+    return b''.join(HKDF_many(salt=salt, IKMs=[IKM, not_IKM], L=8160))
+
+
+@timed('key_derivation.parent_SKs_to_lamport_PKs')
+def parent_SKs_to_lamport_PKs(*, parent_SKs: Sequence[int], indices: Sequence[int]) -> List[bytes]:
+    """
+    Return the compressed Lamport PK of each ``(parent_SK, index)`` pair. The Lamport SKs of every pair
+    are laid out in one contiguous buffer and hashed chunk by chunk in a single pass.
+    """
+    assert len(parent_SKs) == len(indices)
+    lamport_SKs = b''.join(_parent_SK_to_lamport_SKs(parent_SK=parent_SK, index=index)
+                           for parent_SK, index in zip(parent_SKs, indices))
+    count('key_derivation.lamport_SKs.bytes', len(lamport_SKs))
+    lamport_PKs = memoryview(SHA256_chunks(lamport_SKs))
+    return [SHA256(lamport_PKs[i: i + LAMPORT_PKS_LENGTH]) for i in range(0, len(lamport_PKs), LAMPORT_PKS_LENGTH)]
+
+
+def parent_SK_to_lamport_PK(*, parent_SK: int, index: int) -> bytes:
+    return parent_SKs_to_lamport_PKs(parent_SKs=[parent_SK], indices=[index])[0]
 
 
 def HKDF_mod_r(*, IKM: bytes) -> int:
@@ -33,12 +58,21 @@ def HKDF_mod_r(*, IKM: bytes) -> int:
     return int.from_bytes(okm, byteorder='big') % bls_curve_order
 
 
+@timed('key_derivation.derive_child_SK')
 def derive_child_SK(*, parent_SK: int, index: int) -> int:
     assert(index >= 0 and index < 2**32)
     lamport_PK = parent_SK_to_lamport_PK(parent_SK=parent_SK, index=index)
     return HKDF_mod_r(IKM=lamport_PK)
 
 
+@timed('key_derivation.derive_child_SKs')
+def derive_child_SKs(*, parent_SKs: Sequence[int], indices: Sequence[int]) -> List[int]:
+    assert all(index >= 0 and index < 2**32 for index in indices)
+    lamport_PKs = parent_SKs_to_lamport_PKs(parent_SKs=parent_SKs, indices=indices)
+    return [HKDF_mod_r(IKM=lamport_PK) for lamport_PK in lamport_PKs]
+
+
+@timed('key_derivation.derive_master_SK')
 def derive_master_SK(seed: bytes) -> int:
     assert(len(seed) >= 16)
     return HKDF_mod_r(IKM=seed)
@@ -0,0 +1,122 @@
+import json
+import os
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from keystores import Keystore
+
+INDEX_FILE = '.keystore_index.json'
+INDEX_VERSION = 2
+
+# file name -> (mtime_ns, size, pubkey, path)
+# Files that are not keystores are recorded with no pubkey so they are not parsed again until they change.
+IndexEntry = Tuple[int, int, Optional[str], Optional[str]]
+
+
+class KeystoreIndex:
+    """
+    Sidecar index of the keystores in ``folder`` by pubkey and by derivation path. ``refresh`` only parses files
+    added or changed (by mtime and size) since the index was saved, and a lookup parses only the keystore found.
+    """
+    def __init__(self, folder: str, index_file: Optional[str]=None) -> None:
+        self.folder = folder
+        self.index_file = index_file or os.path.join(folder, INDEX_FILE)
+        self.entries: Dict[str, IndexEntry] = {}
+        self.by_pubkey: Dict[str, str] = {}
+        self.by_path: Dict[str, str] = {}
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                self.entries = {file: tuple(entry) for file, entry in index['files'].items()}  # type: ignore
+        except (OSError, ValueError):
+            pass  # A missing or unreadable index is rebuilt by refresh
+        self._build_lookups()
+
+    def _build_lookups(self) -> None:
+        self.by_pubkey = {}
+        self.by_path = {}
+        for file, (_, _, pubkey, path) in sorted(self.entries.items()):
+            if pubkey is not None:
+                self.by_pubkey[pubkey] = file
+                self.by_path[path] = file  # type: ignore
+
+    def _index_file(self, file: str, stat: os.stat_result) -> IndexEntry:
+        with open(os.path.join(self.folder, file), 'rb') as f:
+            content = f.read()
+        try:
+            json_dict = json.loads(content)
+            pubkey, path = json_dict['pubkey'], json_dict['path']
+            if 'crypto' not in json_dict:
+                raise KeyError('crypto')
+        except (ValueError, KeyError, TypeError):
+            pubkey, path = None, None
+        return stat.st_mtime_ns, stat.st_size, pubkey, path
+
+    def refresh(self) -> List[str]:
+        """
+        Bring the index up to date with the folder, saving it if anything changed, and return the names of the
+        files that were (re)indexed.
+        """
+        entries = {}
+        indexed = []
+        with os.scandir(self.folder) as it:
+            for dir_entry in it:
+                if dir_entry.name.startswith('.') or not dir_entry.name.endswith('.json') or not dir_entry.is_file():
+                    continue
+                stat = dir_entry.stat()
+                entry = self.entries.get(dir_entry.name)
+                if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+                    entry = self._index_file(dir_entry.name, stat)
+                    indexed.append(dir_entry.name)
+                entries[dir_entry.name] = entry
+        if indexed or entries.keys() != self.entries.keys():
+            self.entries = entries
+            self._build_lookups()
+            self.save()
+        return indexed
+
+    def save(self) -> None:
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'files': self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_file, self.index_file)
+
+    def _open(self, file: str) -> Keystore:
+        mtime_ns, size, _, _ = self.entries[file]
+        with open(os.path.join(self.folder, file), 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                raise FileNotFoundError(file)
+            return Keystore.from_json(f.read().decode())
+
+    def _lookup(self, lookup: str, key: str) -> Optional[Keystore]:
+        file = getattr(self, lookup).get(key)
+        if file is not None:
+            try:
+                return self._open(file)
+            except FileNotFoundError:
+                pass
+        # The keystore is missing from the index or its file changed since it was indexed
+        self.refresh()
+        file = getattr(self, lookup).get(key)
+        return self._open(file) if file is not None else None
+
+    def find_by_pubkey(self, pubkey: str) -> Optional[Keystore]:
+        """
+        Return the keystore of the hex ``pubkey``, or ``None`` if the folder holds none.
+        """
+        return self._lookup('by_pubkey', pubkey)
+
+    def find_by_path(self, path: str) -> Optional[Keystore]:
+        """
+        Return the keystore of the derivation ``path``, or ``None`` if the folder holds none.
+        """
+        return self._lookup('by_path', path)
+
+    def file_of(self, pubkey: str) -> Optional[str]:
+        return self.by_pubkey.get(pubkey)
@@ -4,8 +4,16 @@ from dataclasses import (
     fields,
     field as dataclass_field
 )
+from functools import lru_cache
 import json
+import re
 from secrets import randbits
+from typing import (
+    Any,
+    Dict,
+    Optional,
+    Tuple,
+)
 from uuid import uuid4
 from utils.crypto import (
     AES_128_CTR,
@@ -13,14 +21,20 @@ from utils.crypto import (
     scrypt,
     SHA256,
 )
-from py_ecc.bls import G2ProofOfPossession as bls
+from utils.bls import bls_priv_to_pub
+from utils.instrumentation import timed
+
+_hex_string = re.compile('[0-9a-f]*')
 
-hexdigits = set('0123456789abcdef')
+KDF_PROFILE_VERSION = 1
+# The weakest KDF params a KDF profile may hold unless explicitly allowed: the defaults of the keystore classes
+MIN_SCRYPT_N = 2**18
+MIN_PBKDF2_C = 2**18
 
 
 def to_bytes(obj):
     if isinstance(obj, str):
-        if all(c in hexdigits for c in obj):
+        if _hex_string.fullmatch(obj):
             return bytes.fromhex(obj)
     elif isinstance(obj, dict):
         for key, value in obj.items():
@@ -28,16 +42,56 @@ def to_bytes(obj):
     return obj
 
 
+@lru_cache(maxsize=None)
+def _bytes_fields(cls) -> Tuple[str, ...]:
+    return tuple(field.name for field in fields(cls) if field.type in (dict, bytes))
+
+
 class BytesDataclass:
     def __post_init__(self):
-        for field in fields(self):
-            if field.type in (dict, bytes):
-                self.__setattr__(field.name, to_bytes(self.__getattribute__(field.name)))
+        for name in _bytes_fields(type(self)):
+            self.__setattr__(name, to_bytes(self.__getattribute__(name)))
 
     def as_json(self) -> str:
         return json.dumps(asdict(self), default=lambda x: x.hex())
 
 
+def check_kdf_profile(profile: Dict[str, Any], allow_weak: bool=False) -> None:
+    """
+    Raise ``ValueError`` unless the params of ``profile`` are well formed and, unless ``allow_weak``, at least
+    ``MIN_SCRYPT_N`` and ``MIN_PBKDF2_C``.
+    """
+    if profile.get('version') != KDF_PROFILE_VERSION:
+        raise ValueError('Not a version %s KDF profile.' % KDF_PROFILE_VERSION)
+    for function, calibrated in profile['kdfs'].items():
+        params = calibrated['params']
+        if function == 'scrypt':
+            n = params.get('n')
+            valid = (isinstance(n, int) and n > 1 and n & (n - 1) == 0 and params.get('r', 0) >= 8 and
+                     params.get('p', 0) >= 1 and (allow_weak or n >= MIN_SCRYPT_N))
+        elif function == 'pbkdf2':
+            c = params.get('c')
+            valid = (isinstance(c, int) and c >= 1 and params.get('prf') == 'hmac-sha256' and
+                     (allow_weak or c >= MIN_PBKDF2_C))
+        else:
+            raise ValueError('Unknown KDF %s in the KDF profile.' % function)
+        if not valid or params.get('dklen') != 32:
+            raise ValueError('The %s params %s of the KDF profile are too weak or malformed.' % (function, params))
+
+
+def load_kdf_profile(file: str, allow_weak: bool=False) -> Dict[str, Any]:
+    """
+    Return the KDF profile written by ``kdf_calibration.py`` to ``file``, after ``check_kdf_profile``.
+    """
+    with open(file, 'r') as f:
+        profile = json.load(f)
+    try:
+        check_kdf_profile(profile, allow_weak=allow_weak)
+    except ValueError as e:
+        raise ValueError('%s: %s' % (file, e))
+    return profile
+
+
 @dataclass
 class KeystoreModule(BytesDataclass):
     function: str = ''
@@ -47,9 +101,9 @@ class KeystoreModule(BytesDataclass):
 
 @dataclass
 class KeystoreCrypto(BytesDataclass):
-    kdf: KeystoreModule = KeystoreModule()
-    checksum: KeystoreModule = KeystoreModule()
-    cipher: KeystoreModule = KeystoreModule()
+    kdf: KeystoreModule = dataclass_field(default_factory=KeystoreModule)
+    checksum: KeystoreModule = dataclass_field(default_factory=KeystoreModule)
+    cipher: KeystoreModule = dataclass_field(default_factory=KeystoreModule)
 
     @classmethod
     def from_json(cls, json_dict: dict):
@@ -61,7 +115,7 @@ class KeystoreCrypto(BytesDataclass):
 
 @dataclass
 class Keystore(BytesDataclass):
-    crypto: KeystoreCrypto = KeystoreCrypto()
+    crypto: KeystoreCrypto = dataclass_field(default_factory=KeystoreCrypto)
     pubkey: str = ''
     path: str = ''
     uuid: str = str(uuid4())  # Generate a new uuid
@@ -70,6 +124,21 @@ class Keystore(BytesDataclass):
     def kdf(self, **kwargs):
         return scrypt(**kwargs) if 'scrypt' in self.crypto.kdf.function else PBKDF2(**kwargs)
 
+    def kdf_memory(self) -> int:
+        if 'scrypt' not in self.crypto.kdf.function:
+            return 0
+        params = self.crypto.kdf.params
+        return 128 * params['r'] * params['n'] * params['p']
+
+    def apply_kdf_profile(self, kdf_profile: Dict[str, Any]) -> None:
+        """
+        Use the params calibrated in ``kdf_profile`` for this keystore's KDF function, if it has any. The profile is
+        trusted as given: check one read from elsewhere with ``check_kdf_profile``, as ``load_kdf_profile`` does.
+        """
+        calibrated = kdf_profile['kdfs'].get(self.crypto.kdf.function)
+        if calibrated is not None:
+            self.crypto.kdf.params.update(calibrated['params'])
+
     def save(self, file: str):
         with open(file, 'w') as f:
             f.write(self.as_json())
@@ -81,7 +150,10 @@ class Keystore(BytesDataclass):
 
     @classmethod
     def from_json(cls, json_str: str):
-        json_dict = json.loads(json_str)
+        return cls.from_json_dict(json.loads(json_str))
+
+    @classmethod
+    def from_json_dict(cls, json_dict: dict):
         crypto = KeystoreCrypto.from_json(json_dict['crypto'])
         pubkey = json_dict['pubkey']
         path = json_dict['path']
@@ -90,22 +162,42 @@ class Keystore(BytesDataclass):
         return cls(crypto=crypto, pubkey=pubkey, path=path, uuid=uuid, version=version)
 
     @classmethod
-    def encrypt(cls, *, secret: bytes, password: str, path: str='',
-                kdf_salt: bytes=randbits(256).to_bytes(32, 'big'),
-                aes_iv: bytes=randbits(128).to_bytes(16, 'big')):
+    @timed('keystores.encrypt')
+    def encrypt(cls, *, secret: bytes, password: str, path: str='', kdf_salt: Optional[bytes]=None,
+                aes_iv: Optional[bytes]=None, pubkey: Optional[bytes]=None, kdf_params: Optional[dict]=None,
+                kdf_profile: Optional[Dict[str, Any]]=None):
+        """
+        Encrypt ``secret`` under ``password`` with the class's KDF params, overridden by those calibrated in
+        ``kdf_profile`` and then by ``kdf_params``. A ``pubkey`` given to save deriving it is written as is, so it
+        must be the pubkey of ``secret``.
+        """
+        if kdf_salt is None:
+            kdf_salt = randbits(256).to_bytes(32, 'big')
+        if aes_iv is None:
+            aes_iv = randbits(128).to_bytes(16, 'big')
         keystore = cls()
+        if kdf_profile is not None:
+            keystore.apply_kdf_profile(kdf_profile)
+        keystore.crypto.kdf.params.update(kdf_params or {})
         keystore.crypto.kdf.params['salt'] = kdf_salt
         decryption_key = keystore.kdf(password=password, **keystore.crypto.kdf.params)
         keystore.crypto.cipher.params['iv'] = aes_iv
         cipher = AES_128_CTR(key=decryption_key[:16], **keystore.crypto.cipher.params)
         keystore.crypto.cipher.message = cipher.encrypt(secret)
         keystore.crypto.checksum.message = SHA256(decryption_key[16:32] + keystore.crypto.cipher.message)
-        keystore.pubkey = bls.PrivToPub(int.from_bytes(secret, 'big')).hex()
+        if pubkey is None:
+            pubkey = bls_priv_to_pub(int.from_bytes(secret, 'big'))
+        keystore.pubkey = pubkey.hex()
         keystore.path = path
         return keystore
 
-    def decrypt(self, password: str) -> bytes:
-        decryption_key = self.kdf(password=password, **self.crypto.kdf.params)
+    @timed('keystores.decrypt')
+    def decrypt(self, password: str, decryption_key: Optional[bytes]=None) -> bytes:
+        """
+        Decrypt the secret with ``password``, or with the ``decryption_key`` it derives if that is already known.
+        """
+        if decryption_key is None:
+            decryption_key = self.kdf(password=password, **self.crypto.kdf.params)
         assert SHA256(decryption_key[16:32] + self.crypto.cipher.message) == self.crypto.checksum.message
         cipher = AES_128_CTR(key=decryption_key[:16], **self.crypto.cipher.params)
         return cipher.decrypt(self.crypto.cipher.message)
@@ -113,7 +205,7 @@ class Keystore(BytesDataclass):
 
 @dataclass
 class Pbkdf2Keystore(Keystore):
-    crypto: KeystoreCrypto = KeystoreCrypto(
+    crypto: KeystoreCrypto = dataclass_field(default_factory=lambda: KeystoreCrypto(
         kdf=KeystoreModule(
             function='pbkdf2',
             params={
@@ -128,12 +220,12 @@ class Pbkdf2Keystore(Keystore):
         cipher=KeystoreModule(
             function='aes-128-ctr',
         )
-    )
+    ))
 
 
 @dataclass
 class ScryptKeystore(Keystore):
-    crypto: KeystoreCrypto = KeystoreCrypto(
+    crypto: KeystoreCrypto = dataclass_field(default_factory=lambda: KeystoreCrypto(
         kdf=KeystoreModule(
             function='scrypt',
             params={
@@ -149,4 +241,4 @@ class ScryptKeystore(Keystore):
         cipher=KeystoreModule(
             function='aes-128-ctr',
         )
-    )
+    ))
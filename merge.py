@@ -0,0 +1,109 @@
+from argparse import ArgumentParser
+import sys
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Tuple,
+)
+
+from deposit import (
+    iter_deposit_data,
+    open_deposit_data_writer,
+)
+from shards import open_manifest
+from verify import verify_deposit_data
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : merge the deposit data of generation shards')
+    parser.add_argument('files', nargs='+', help='Deposit data files written by deposit.py --shard')
+    parser.add_argument('--output', default='./deposit_data.json', type=str, help='Merged deposit data file')
+    parser.add_argument('--skip_signatures', action='store_true', help='Only check deposit_data_root, not signatures')  # noqa: E501
+    parser.add_argument('--batch_size', type=int, default=64, help='Number of signatures checked per batch verification')  # noqa: E501
+
+    args = parser.parse_args()
+    return args
+
+
+def iter_shard_entries(files: List[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield ``(validator_index, entry)`` for the entries of the shard deposit data ``files`` in index order,
+    streaming one file at a time. Raises ``ValueError`` if a shard is unfinished or validators are missing.
+    """
+    manifests = []
+    for file in files:
+        try:
+            manifests.append((open_manifest(file), file))
+        except FileNotFoundError:
+            raise ValueError('%s has no manifest, its shard has not finished.' % file)
+    manifests.sort(key=lambda manifest: manifest[0]['start_index'])
+    next_index = manifests[0][0]['start_index']
+    for manifest, file in manifests:
+        start_index, num_validators = manifest['start_index'], manifest['num_validators']
+        if start_index > next_index:
+            raise ValueError('No shard holds validators %s to %s.' % (next_index, start_index - 1))
+        count = 0
+        for count, entry in enumerate(iter_deposit_data(file), 1):
+            yield start_index + count - 1, entry
+        if count != num_validators:
+            raise ValueError('%s holds %s entries, its manifest lists %s.' % (file, count, num_validators))
+        next_index = max(next_index, start_index + num_validators)
+
+
+class _Rejected(Exception):
+    pass
+
+
+def merge_deposit_data(files: List[str], output: str, check_signatures: bool=True,
+                       batch_size: int=64) -> List[Tuple[int, str]]:
+    """
+    Merge shard deposit data ``files`` into one deposit data file ordered by validator index, dropping the
+    duplicates of overlapping shards, and return the problems found validating the merged entries. ``output`` is
+    only written if there are none. Only the pubkeys and roots of the entries written so far are held in memory.
+    """
+    written: Dict[str, Tuple[int, str]] = {}  # pubkey -> (validator index, deposit_data_root)
+
+    def unique_entries() -> Iterator[Dict[str, Any]]:
+        last_index = -1
+        for index, entry in iter_shard_entries(files):
+            if entry['pubkey'] in written:
+                if written[entry['pubkey']] != (index, entry['deposit_data_root']):
+                    raise ValueError('Conflicting deposit data for pubkey %s.' % entry['pubkey'])
+                continue
+            if index <= last_index:
+                raise ValueError('Shards disagree on validator %s, were they generated from one mnemonic?' % index)
+            last_index = index
+            written[entry['pubkey']] = (index, entry['deposit_data_root'])
+            writer.write(entry)
+            yield entry
+
+    try:
+        with open_deposit_data_writer(output) as writer:
+            problems = list(verify_deposit_data(unique_entries(), batch_size=batch_size,
+                                                check_signatures=check_signatures))
+            if problems:
+                raise _Rejected  # Discard the merged entries, leaving any previous output as it was
+    except _Rejected:
+        pass
+    return problems
+
+
+def main():
+    args = get_args()
+    try:
+        problems = merge_deposit_data(args.files, args.output, check_signatures=not args.skip_signatures,
+                                      batch_size=args.batch_size)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    for index, reason in problems:
+        print('%s[%s]: %s' % (args.output, index, reason))
+    if problems:
+        sys.exit(1)
+    print('Merged %s files into %s.' % (len(args.files), args.output))
+
+
+if __name__ == '__main__':
+    main()
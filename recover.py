@@ -0,0 +1,95 @@
+from argparse import ArgumentParser
+from functools import partial
+from multiprocessing import get_context
+import sys
+from time import perf_counter
+from typing import (
+    Iterable,
+    Optional,
+)
+from unicodedata import normalize
+
+from credentials import (
+    CRED_TYPES,
+    validator_nodes,
+)
+from key_derivation.engine import DerivationEngine
+from key_derivation.mnemonic import (
+    candidate_mnemonics,
+    validate_mnemonic,
+)
+from utils.bls import bls_priv_to_pub
+from utils.parallel import (
+    imap_bounded,
+    worker_count,
+)
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : recover a mnemonic with unreadable or transposed words')
+    parser.add_argument('--pubkey', type=str, required=True, help='A signing or withdrawal pubkey (hex) of one of the validators')  # noqa: E501
+    parser.add_argument('--index', type=int, default=0, help='Index of the validator the pubkey belongs to')
+    parser.add_argument('--swaps', action='store_true', help='Also try every transposition of two words')
+    parser.add_argument('--mnemonic_pwd', default='', type=str, help='The password of the mnemonic, if it has one')  # noqa: E501
+    parser.add_argument('--num_workers', type=int, default=None, help='Number of processes testing candidates. (Defaults to the number of CPUs)')  # noqa: E501
+
+    args = parser.parse_args()
+    return args
+
+
+def mnemonic_has_pubkey(mnemonic: str, password: str, pubkey: bytes, index: int) -> bool:
+    """
+    Return whether ``pubkey`` is the signing or withdrawal pubkey of validator ``index`` under ``mnemonic``.
+    """
+    with DerivationEngine(mnemonic=mnemonic, password=password) as engine:
+        sks = engine.derive_many([validator_nodes(index, cred_type) for cred_type in CRED_TYPES])
+    return any(bls_priv_to_pub(sk) == pubkey for sk in sks)
+
+
+def recover_mnemonic(candidates: Iterable[str], password: str, pubkey: bytes, index: int=0,
+                     num_workers: Optional[int]=None) -> Optional[str]:
+    """
+    Return the first of the checksum-valid ``candidates`` whose validator ``index`` has ``pubkey``, or ``None``.
+    The candidates are tested over a process pool, and the search stops as soon as one matches.
+    """
+    test = partial(mnemonic_has_pubkey, password=password, pubkey=pubkey, index=index)
+    for candidate, matches in imap_bounded(test, candidates, num_workers=worker_count(max_workers=num_workers),
+                                           mp_context=get_context('spawn')):
+        if matches:
+            return candidate
+    return None
+
+
+def main():
+    args = get_args()
+    entered = input('Enter the mnemonic, with a ? for each word you cannot read.')
+    words = [None if word == '?' else word for word in normalize('NFKD', entered).split()]
+    if None not in words and validate_mnemonic(' '.join(words)) and not args.swaps:  # type: ignore
+        print('The mnemonic is valid as entered, try --swaps if it does not produce the pubkey.')
+        sys.exit(1)
+
+    start = perf_counter()
+    candidates = 0
+
+    def counted(mnemonics: Iterable[str]) -> Iterable[str]:
+        nonlocal candidates
+        for mnemonic in mnemonics:
+            candidates += 1
+            yield mnemonic
+
+    try:
+        mnemonic = recover_mnemonic(counted(candidate_mnemonics(words, swaps=args.swaps)), args.mnemonic_pwd,
+                                    bytes.fromhex(args.pubkey), index=args.index, num_workers=args.num_workers)
+    except KeyError as e:
+        print('%s is not a BIP-39 word.' % e)
+        sys.exit(1)
+    elapsed = perf_counter() - start
+    print('Tested %s checksum-valid candidates in %.2fs.' % (candidates, elapsed))
+    if mnemonic is None:
+        print('No candidate produces the pubkey.')
+        sys.exit(1)
+    print('Recovered mnemonic:\n\n%s\n' % mnemonic)
+
+
+if __name__ == '__main__':
+    main()
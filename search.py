@@ -0,0 +1,169 @@
+from argparse import ArgumentParser
+from functools import partial
+import json
+from multiprocessing import get_context
+import os
+import sys
+from time import perf_counter
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from credentials import (
+    CRED_TYPES,
+    format_path,
+    validator_nodes,
+)
+from key_derivation.engine import DerivationEngine
+from key_derivation.tree import derive_child_SK
+from utils.bls import bls_priv_to_pub
+from utils.constants import (
+    COIN_TYPE,
+    PURPOSE,
+)
+from utils.parallel import (
+    imap_bounded,
+    worker_count,
+)
+
+MAP_VERSION = 1
+
+# pubkey (hex) -> (validator index, cred_type)
+PubkeyMap = Dict[str, Tuple[int, str]]
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : find the validator indices of pubkeys under a mnemonic')
+    parser.add_argument('pubkeys', nargs='*', help='Signing or withdrawal pubkeys (hex) to look for')
+    parser.add_argument('--start_index', type=int, default=0, help='First validator index scanned')
+    parser.add_argument('--num_indices', type=int, default=10000, help='Number of validator indices scanned')
+    parser.add_argument('--cred_types', nargs='+', default=list(CRED_TYPES), choices=CRED_TYPES, help='Keys derived for each index')  # noqa: E501
+    parser.add_argument('--map_file', type=str, default=None, help='Pubkey to index map consulted before scanning and extended with what is scanned')  # noqa: E501
+    parser.add_argument('--mnemonic_pwd', default='', type=str, help='The password of the mnemonic, if it has one')  # noqa: E501
+    parser.add_argument('--num_workers', type=int, default=None, help='Number of processes deriving keys. (Defaults to the number of CPUs)')  # noqa: E501
+    parser.add_argument('--chunk_size', type=int, default=32, help='Number of indices handed to a worker at once')
+
+    args = parser.parse_args()
+    return args
+
+
+def load_pubkey_map(file: str) -> PubkeyMap:
+    """
+    Return the pubkey map saved in ``file``, or an empty one if it is missing or of another version.
+    """
+    try:
+        with open(file, 'r') as f:
+            saved = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if saved.get('version') != MAP_VERSION:
+        return {}
+    return {pubkey: (index, cred_type) for pubkey, (index, cred_type) in saved['pubkeys'].items()}
+
+
+def save_pubkey_map(file: str, pubkey_map: PubkeyMap) -> None:
+    tmp_file = file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': MAP_VERSION, 'pubkeys': pubkey_map}, f, separators=(',', ':'))
+    os.replace(tmp_file, file)
+
+
+def derive_coin_type_SK(mnemonic: str, password: str) -> int:
+    """
+    Return the SK of the ``m/12381/3600`` node every validator path descends from.
+    """
+    with DerivationEngine(mnemonic=mnemonic, password=password) as engine:
+        return engine.derive((PURPOSE, COIN_TYPE))
+
+
+def derive_pubkeys(indices: Tuple[int, int], coin_type_SK: int,
+                   cred_types: Sequence[str]=CRED_TYPES) -> List[Tuple[int, str, bytes]]:
+    """
+    Return ``(index, cred_type, pubkey)`` for the validators in ``range(*indices)``, deriving from the shared
+    ``m/12381/3600`` node so that each index costs two or three child derivations and no seed derivation.
+    """
+    pubkeys = []
+    for index in range(*indices):
+        withdrawal_SK = derive_child_SK(parent_SK=derive_child_SK(parent_SK=coin_type_SK, index=index), index=0)
+        for cred_type in cred_types:
+            sk = derive_child_SK(parent_SK=withdrawal_SK, index=0) if cred_type == 'signing' else withdrawal_SK
+            pubkeys.append((index, cred_type, bls_priv_to_pub(sk)))
+    return pubkeys
+
+
+def _chunks(start_index: int, num_indices: int, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    stop = start_index + num_indices
+    for start in range(start_index, stop, chunk_size):
+        yield start, min(start + chunk_size, stop)
+
+
+def search_pubkeys(coin_type_SK: int, targets: Iterable[bytes], start_index: int, num_indices: int, *,
+                   cred_types: Sequence[str]=CRED_TYPES, pubkey_map: Optional[PubkeyMap]=None,
+                   num_workers: Optional[int]=None, chunk_size: int=32) -> Tuple[Dict[bytes, Tuple[int, str]], int]:
+    """
+    Scan validators ``start_index`` to ``start_index + num_indices - 1`` for the ``targets`` pubkeys over a process
+    pool, returning the ``(index, cred_type)`` found for each target and the number of indices scanned. The scan
+    stops once every target is found; with no targets it covers the whole range. Every pubkey derived is added
+    to ``pubkey_map`` if one is given.
+    """
+    remaining = set(targets)
+    early_exit = bool(remaining)
+    found: Dict[bytes, Tuple[int, str]] = {}
+    scanned = 0
+    derive = partial(derive_pubkeys, coin_type_SK=coin_type_SK, cred_types=tuple(cred_types))
+    results = imap_bounded(derive, _chunks(start_index, num_indices, chunk_size),
+                           num_workers=worker_count(max_workers=num_workers), mp_context=get_context('spawn'))
+    for (start, stop), pubkeys in results:
+        scanned += stop - start
+        for index, cred_type, pubkey in pubkeys:
+            if pubkey_map is not None:
+                pubkey_map[pubkey.hex()] = (index, cred_type)
+            if pubkey in remaining:
+                remaining.remove(pubkey)
+                found[pubkey] = (index, cred_type)
+        if early_exit and not remaining:
+            break
+    return found, scanned
+
+
+def main():
+    args = get_args()
+    targets = [bytes.fromhex(pubkey[2:] if pubkey.startswith('0x') else pubkey) for pubkey in args.pubkeys]
+    pubkey_map = load_pubkey_map(args.map_file) if args.map_file is not None else {}
+    found = {pubkey: pubkey_map[pubkey.hex()] for pubkey in targets if pubkey.hex() in pubkey_map}
+    remaining = [pubkey for pubkey in targets if pubkey not in found]
+
+    if remaining or not targets:
+        mnemonic = input('Enter the mnemonic the pubkeys were derived from.').strip()
+        coin_type_SK = derive_coin_type_SK(mnemonic, args.mnemonic_pwd)
+        start = perf_counter()
+        scanned_found, scanned = search_pubkeys(
+            coin_type_SK, remaining, args.start_index, args.num_indices, cred_types=args.cred_types,
+            pubkey_map=pubkey_map if args.map_file is not None else None, num_workers=args.num_workers,
+            chunk_size=args.chunk_size)
+        elapsed = perf_counter() - start
+        found.update(scanned_found)
+        print('Scanned %s indices (%s keys) in %.2fs: %.1f indices/s.' % (
+            scanned, scanned * len(args.cred_types), elapsed, scanned / elapsed if elapsed else 0))
+        if args.map_file is not None:
+            save_pubkey_map(args.map_file, pubkey_map)
+
+    for pubkey in targets:
+        if pubkey in found:
+            index, cred_type = found[pubkey]
+            print('%s: %s key of validator %s (%s)' % (
+                pubkey.hex(), cred_type, index, format_path(validator_nodes(index, cred_type))))
+        else:
+            print('%s: not found' % pubkey.hex())
+    if len(found) < len(targets):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+from argparse import ArgumentTypeError
+import json
+from typing import (
+    Any,
+    Dict,
+    Tuple,
+)
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    Parse a ``k/N`` shard specification, with ``0 <= k < N``. Raises ``ArgumentTypeError`` otherwise, so that it can
+    be the ``type`` of an argparse argument.
+    """
+    try:
+        k, n = (int(x) for x in shard.split('/'))
+    except ValueError:
+        raise ArgumentTypeError('%r is not a k/N shard specification' % shard)
+    if not 0 <= k < n:
+        raise ArgumentTypeError('shard %s/%s is not in 0/%s to %s/%s' % (k, n, n, n - 1, n))
+    return k, n
+
+
+def shard_range(start_index: int, num_validators: int, shard: int, num_shards: int) -> range:
+    """
+    Return the validator indices of ``shard`` when ``num_validators`` validators from ``start_index`` are
+    split into ``num_shards`` contiguous, disjoint and (within one validator) equally sized ranges.
+    """
+    size, extra = divmod(num_validators, num_shards)
+    shard_start = start_index + shard * size + min(shard, extra)
+    return range(shard_start, shard_start + size + (shard < extra))
+
+
+def manifest_file(deposit_file: str) -> str:
+    return deposit_file + '.manifest'
+
+
+def save_manifest(deposit_file: str, indices: range, shard: int, num_shards: int) -> None:
+    """
+    Record which validators ``deposit_file`` holds. It is written once the shard is complete, so a deposit
+    file without a manifest is the output of an unfinished shard.
+    """
+    manifest = {
+        'deposit_file': deposit_file,
+        'start_index': indices.start,
+        'num_validators': len(indices),
+        'shard': shard,
+        'num_shards': num_shards,
+    }
+    with open(manifest_file(deposit_file), 'w') as f:
+        json.dump(manifest, f)
+
+
+def open_manifest(deposit_file: str) -> Dict[str, Any]:
+    with open(manifest_file(deposit_file), 'r') as f:
+        return json.load(f)
@@ -0,0 +1,412 @@
+"""
+Long-running signing service for the keystores of a folder. They are decrypted once at startup and their SKs held
+in memory, and requests are served over a Unix socket as one JSON object per line::
+
+    {"id": 1, "method": "sign", "pubkey": "<hex>", "message": "<32-byte signing root, hex>"}
+    {"id": 2, "method": "pubkeys"}
+    {"id": 3, "method": "stats"}
+
+and answered by ``{"id": ..., "result": ...}`` or ``{"id": ..., "error": "..."}``. Concurrent requests for the same
+pubkey and message are coalesced into one signature, and the others are collected into batches for a pool of BLS
+worker processes.
+"""
+from argparse import ArgumentParser
+import asyncio
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+import json
+from multiprocessing import get_context
+import os
+import signal
+import stat
+import sys
+from time import perf_counter
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from bulk_keystores import (
+    decrypt_keystores,
+    load_keystores,
+)
+from utils.bls import (
+    bls_priv_to_pub,
+    bls_sign,
+    get_backend,
+)
+from utils.parallel import worker_count
+
+MESSAGE_SIZE = 32
+LATENCY_WINDOW = 10000
+
+SignRequest = Tuple[bytes, bytes]  # (pubkey, message)
+
+_worker_secrets: Dict[bytes, int] = {}
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : serve signatures for a folder of keystores over a Unix socket')
+    parser.add_argument('folder', type=str, help='Folder of keystore files')
+    parser.add_argument('--socket', default='./signer.sock', type=str, help='Path of the Unix socket to listen on')
+    parser.add_argument('--num_workers', type=int, default=None, help='Number of BLS worker processes, 0 to sign in the service process. (Defaults to the number of CPUs)')  # noqa: E501
+    parser.add_argument('--max_batch', type=int, default=64, help='Maximum number of signatures sent to a worker at once')  # noqa: E501
+    parser.add_argument('--batch_delay', type=float, default=0.002, help='Seconds to wait for more requests before dispatching a batch')  # noqa: E501
+
+    args = parser.parse_args()
+    return args
+
+
+def _init_worker(secrets: Dict[bytes, int]) -> None:
+    global _worker_secrets
+    _worker_secrets = secrets
+    get_backend()  # Import the BLS backend before the first request rather than while serving it
+
+
+def _sign_batch(requests: List[SignRequest]) -> List[bytes]:
+    return [bls_sign(_worker_secrets[pubkey], message) for pubkey, message in requests]
+
+
+def secrets_by_pubkey(folder: str, password: str, num_workers: Optional[int]=None) -> Dict[bytes, int]:
+    """
+    Decrypt the keystores in ``folder``, their KDFs in parallel, returning their SKs by the pubkey derived from
+    each SK. Raises ``ValueError`` if a keystore's ``pubkey`` is not that of its SK.
+    """
+    keystores = load_keystores(folder)
+    secrets = decrypt_keystores(keystores, password, num_workers=num_workers)
+    by_pubkey = {}
+    for file, keystore in keystores.items():
+        sk = int.from_bytes(secrets[file], 'big')
+        pubkey = bls_priv_to_pub(sk)
+        if keystore.pubkey and bytes.fromhex(keystore.pubkey) != pubkey:
+            raise ValueError('The pubkey of keystore %s is not that of its secret.' % file)
+        by_pubkey[pubkey] = sk
+    return by_pubkey
+
+
+class ServiceStats:
+    """
+    Counters of the requests served, and the latencies of the last ``LATENCY_WINDOW`` signatures.
+    """
+    def __init__(self) -> None:
+        self.started = perf_counter()
+        self.requests = 0
+        self.signatures = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction: float) -> float:
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0
+
+        uptime = perf_counter() - self.started
+        return {
+            'uptime_seconds': uptime,
+            'requests': self.requests,
+            'signatures': self.signatures,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'errors': self.errors,
+            'signatures_per_second': self.signatures / uptime if uptime else 0,
+            'mean_batch_size': self.signatures / self.batches if self.batches else 0,
+            'p50_ms': percentile(0.5),
+            'p99_ms': percentile(0.99),
+        }
+
+
+class SigningService:
+    """
+    Signs for the SKs of ``secrets`` (by pubkey). Requests are queued and dispatched in batches of up to
+    ``max_batch``, waiting at most ``batch_delay`` seconds for a batch to fill, to ``num_workers`` processes
+    holding the SKs (0 signs in a thread of this process), with at most two batches in flight per worker.
+    """
+    def __init__(self, secrets: Dict[bytes, int], num_workers: Optional[int]=None, max_batch: int=64,
+                 batch_delay: float=0.002) -> None:
+        assert max_batch > 0
+        self.secrets = secrets
+        self.num_workers = worker_count(max_workers=num_workers) if num_workers != 0 else 0
+        self.max_batch = max_batch
+        self.batch_delay = batch_delay
+        self.stats = ServiceStats()
+        self._inflight: Dict[SignRequest, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[Executor] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self) -> None:
+        if self.num_workers:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.secrets,))
+        else:
+            _init_worker(self.secrets)
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(2 * max(self.num_workers, 1))
+        self._batcher = asyncio.ensure_future(self._dispatch_batches())
+
+    async def close(self) -> None:
+        """
+        Stop batching and fail the requests still queued or being signed, so that no caller is left waiting.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_exception(RuntimeError('the signing service is closing'))
+        self._inflight.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'SigningService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def sign(self, pubkey: bytes, message: bytes) -> bytes:
+        if pubkey not in self.secrets:
+            raise ValueError('unknown pubkey %s' % pubkey.hex())
+        if len(message) != MESSAGE_SIZE:
+            raise ValueError('message is %s bytes, expected a %s-byte signing root' % (len(message), MESSAGE_SIZE))
+        assert self._queue is not None, 'the service has not been started'
+        start = perf_counter()
+        key = (pubkey, message)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            future = self._inflight[key] = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait(key)
+        signature = await asyncio.shield(future)
+        self.stats.latencies.append(perf_counter() - start)
+        return signature
+
+    async def _next_batch(self) -> List[SignRequest]:
+        assert self._queue is not None
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_delay
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _dispatch_batches(self) -> None:
+        assert self._slots is not None
+        while True:
+            batch = await self._next_batch()
+            await self._slots.acquire()
+            asyncio.ensure_future(self._sign(batch))
+
+    async def _sign(self, batch: List[SignRequest]) -> None:
+        assert self._slots is not None
+        try:
+            signatures = await asyncio.get_running_loop().run_in_executor(self._executor, _sign_batch, batch)
+        except Exception as e:  # Counted in the errors by ``_respond``, once per request
+            for key in batch:
+                future = self._inflight.pop(key, None)
+                if future is not None:  # Unless failed by ``close``
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        self.stats.batches += 1
+        self.stats.signatures += len(batch)
+        for key, signature in zip(batch, signatures):
+            future = self._inflight.pop(key, None)
+            if future is not None:
+                future.set_result(signature)
+
+    async def handle(self, request: Dict[str, Any]) -> Any:
+        method = request.get('method')
+        if method == 'sign':
+            signature = await self.sign(bytes.fromhex(request['pubkey']), bytes.fromhex(request['message']))
+            return signature.hex()
+        if method == 'pubkeys':
+            return sorted(pubkey.hex() for pubkey in self.secrets)
+        if method == 'stats':
+            return self.stats.as_dict()
+        raise ValueError('unknown method %r' % method)
+
+    async def _respond(self, request: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        self.stats.requests += 1
+        try:
+            response = {'id': request.get('id'), 'result': await self.handle(request)}
+        except Exception as e:
+            self.stats.errors += 1
+            response = {'id': request.get('id'), 'error': '%s: %s' % (type(e).__name__, e)}
+        writer.write(json.dumps(response).encode() + b'\n')
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answer the requests of one connection, concurrently, so that a client can pipeline them.
+        """
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    assert isinstance(request, dict)
+                except (ValueError, AssertionError):
+                    self.stats.errors += 1
+                    writer.write(json.dumps({'id': None, 'error': 'malformed request'}).encode() + b'\n')
+                    continue
+                task = asyncio.ensure_future(self._respond(request, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service: SigningService, socket_path: str, ready: Optional[asyncio.Event]=None) -> None:
+    """
+    Serve ``service`` on the Unix socket ``socket_path``, readable and writable by this user only, until cancelled.
+    A stale socket at ``socket_path`` is replaced, but any other file there raises ``FileExistsError``.
+    """
+    try:
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            raise FileExistsError('%s exists and is not a socket.' % socket_path)
+        os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+    umask = os.umask(0o177)  # Bind the socket with mode 0o600, so no other user can connect in between
+    try:
+        server = await asyncio.start_unix_server(service.serve_connection, path=socket_path)
+    finally:
+        os.umask(umask)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class SignerClient:
+    """
+    Client of a signing service, pipelining the requests of concurrent callers over one connection.
+    """
+    def __init__(self, socket_path: str) -> None:
+        self.socket_path = socket_path
+        self._next_id = 0
+        self._responses: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'SignerClient':
+        reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        self._reader_task = asyncio.ensure_future(self._read_responses(reader))
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        assert self._writer is not None and self._reader_task is not None
+        self._writer.close()
+        self._reader_task.cancel()
+        await asyncio.gather(self._reader_task, return_exceptions=True)
+
+    async def _read_responses(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                for future in self._responses.values():
+                    future.set_exception(ConnectionError('the signing service closed the connection'))
+                return
+            response = json.loads(line)
+            future = self._responses.pop(response['id'])
+            if 'error' in response:
+                future.set_exception(ValueError(response['error']))
+            else:
+                future.set_result(response['result'])
+
+    async def call(self, method: str, **params: Any) -> Any:
+        assert self._writer is not None
+        self._next_id += 1
+        future = self._responses[self._next_id] = asyncio.get_running_loop().create_future()
+        self._writer.write(json.dumps({'id': self._next_id, 'method': method, **params}).encode() + b'\n')
+        await self._writer.drain()
+        return await future
+
+    async def sign(self, pubkey: bytes, message: bytes) -> bytes:
+        return bytes.fromhex(await self.call('sign', pubkey=pubkey.hex(), message=message.hex()))
+
+    async def pubkeys(self) -> List[bytes]:
+        return [bytes.fromhex(pubkey) for pubkey in await self.call('pubkeys')]
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self.call('stats')
+
+
+async def run_service(secrets: Dict[bytes, int], socket_path: str, num_workers: Optional[int]=None,
+                      max_batch: int=64, batch_delay: float=0.002) -> Dict[str, Any]:
+    """
+    Serve until SIGINT or SIGTERM, returning the final stats.
+    """
+    loop = asyncio.get_running_loop()
+    async with SigningService(secrets, num_workers=num_workers, max_batch=max_batch,
+                              batch_delay=batch_delay) as service:
+        serving = asyncio.ensure_future(serve(service, socket_path))
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, serving.cancel)
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+        return service.stats.as_dict()
+
+
+def main():
+    args = get_args()
+    password = input('Enter the password of the keystores in %s.' % args.folder)
+    start = perf_counter()
+    try:
+        secrets = secrets_by_pubkey(args.folder, password, num_workers=args.num_workers)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if not secrets:
+        print('No keystores found in %s.' % args.folder)
+        sys.exit(1)
+    print('Decrypted %s keystores in %.2fs, listening on %s.' % (len(secrets), perf_counter() - start, args.socket))
+    try:
+        stats = asyncio.run(run_service(secrets, args.socket, num_workers=args.num_workers,
+                                        max_batch=args.max_batch, batch_delay=args.batch_delay))
+    except FileExistsError as e:
+        print(e)
+        sys.exit(1)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import pytest
+
+from bulk_keystores import (
+    KdfCache,
+    decrypt_keystores,
+    load_keystores,
+    reencrypt_keystores,
+)
+from keystores import Pbkdf2Keystore
+
+test_secrets = [(i + 1).to_bytes(32, 'big') for i in range(3)]
+
+
+def save_test_keystores(folder, kdf_salts):
+    for i, (secret, kdf_salt) in enumerate(zip(test_secrets, kdf_salts)):
+        keystore = Pbkdf2Keystore.encrypt(secret=secret, password='testpassword', path='m/12381/3600/%s/0/0' % i,
+                                          kdf_salt=kdf_salt, pubkey=bytes(48), kdf_params={'c': 2**10})
+        keystore.save(str(folder / ('keystore-%s.json' % i)))
+    (folder / 'deposit_data.json').write_text('[]')
+
+
+def test_decrypt_computes_shared_kdf_once(tmp_path):
+    save_test_keystores(tmp_path, [bytes(32), bytes(32), bytes([1]) * 32])
+    keystores = load_keystores(str(tmp_path))
+    assert sorted(keystores) == ['keystore-0.json', 'keystore-1.json', 'keystore-2.json']
+    cache = KdfCache()
+    secrets = decrypt_keystores(keystores, 'testpassword', cache=cache, num_workers=2)
+    assert [secrets['keystore-%s.json' % i] for i in range(3)] == test_secrets
+    assert (cache.misses, cache.hits) == (2, 1)
+    with pytest.raises(ValueError):
+        decrypt_keystores(keystores, 'wrongpassword', num_workers=1)
+
+
+def test_reencrypt_keystores(tmp_path):
+    save_test_keystores(tmp_path, [bytes(32)] * 3)
+    keystores = load_keystores(str(tmp_path))
+    secrets = decrypt_keystores(keystores, 'testpassword', num_workers=1)
+    timings = {}
+    reencrypted = reencrypt_keystores(keystores, secrets, 'newpassword', num_workers=2, timings=timings)
+    assert 'encrypt' in timings
+    assert len({keystore.crypto.kdf.params['salt'] for keystore in reencrypted.values()}) == 3
+    for file, keystore in reencrypted.items():
+        assert keystore.crypto.kdf.params['c'] == 2**10
+        assert keystore.path == keystores[file].path
+        assert keystore.decrypt('newpassword') == secrets[file]
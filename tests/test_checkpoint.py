@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from checkpoint import CheckpointJournal
+import deposit
+from deposit import (
+    generate_deposits,
+    iter_deposit_data,
+)
+from keystores import Pbkdf2Keystore
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+test_passwords = {'signing': 'testpassword'}
+
+
+def generate(tmp_path, num_validators, **kwargs):
+    generate_deposits(test_mnemonic, '', num_validators, test_passwords, folder=str(tmp_path) + '/',
+                      file=str(tmp_path / 'deposit_data.json'), keystore_cls=Pbkdf2Keystore, num_workers=1,
+                      checkpoint_file=str(tmp_path / 'checkpoint.jsonl'), **kwargs)
+    return (tmp_path / 'deposit_data.json').read_text()
+
+
+def test_resume_skips_completed_validators(tmp_path, monkeypatch):
+    deposit_data = generate(tmp_path, 3)
+    journal_lines = (tmp_path / 'checkpoint.jsonl').read_text().splitlines()
+    assert [json.loads(line)['index'] for line in journal_lines] == [0, 1, 2]
+    # Interrupted while writing the third validator, and the second keystore has been corrupted since
+    (tmp_path / 'checkpoint.jsonl').write_text('\n'.join(journal_lines[:2]) + '\n' + journal_lines[2][:40])
+    (tmp_path / 'deposit_data.json').write_text(deposit_data[:100])
+    (tmp_path / 'signing-keystore-m_12381_3600_1_0_0.json').write_text('{}')
+
+    encrypted = []
+    encrypt_credential = deposit._encrypt_credential
+
+    def counting_encrypt_credential(credential, **kwargs):
+        encrypted.append(credential.index)
+        return encrypt_credential(credential, **kwargs)
+
+    monkeypatch.setattr(deposit, '_encrypt_credential', counting_encrypt_credential)
+    assert generate(tmp_path, 3, resume=True) == deposit_data
+    assert encrypted == [1, 2]
+    assert len(list(iter_deposit_data(str(tmp_path / 'deposit_data.json')))) == 3
+
+
+def test_resume_rejects_other_mnemonic(tmp_path):
+    generate(tmp_path, 1)
+    with pytest.raises(ValueError):
+        generate_deposits('legal winner thank year wave sausage worth useful legal winner thank yellow', '', 1,
+                          test_passwords, folder=str(tmp_path) + '/', file=str(tmp_path / 'deposit_data.json'),
+                          keystore_cls=Pbkdf2Keystore, num_workers=1,
+                          checkpoint_file=str(tmp_path / 'checkpoint.jsonl'), resume=True)
+
+
+def test_start_index(tmp_path):
+    full = json.loads(generate(tmp_path, 3))
+    partial = json.loads(generate(tmp_path, 1, start_index=2))
+    assert partial == full[2:]
+
+
+def test_resume_after_torn_line(tmp_path):
+    file = str(tmp_path / 'checkpoint.jsonl')
+    pubkeys = {'signing': b'\x01' * 48}
+    with CheckpointJournal(file) as journal:
+        journal.record(0, pubkeys, {}, {'index': 0}, folder=str(tmp_path))
+        journal.record(1, pubkeys, {}, {'index': 1}, folder=str(tmp_path))
+    with open(file, 'r+') as f:
+        f.truncate(len(f.readline()) + 20)
+    with CheckpointJournal(file, resume=True) as journal:
+        assert list(journal.records) == [0]
+        journal.record(2, pubkeys, {}, {'index': 2}, folder=str(tmp_path))
+    assert list(CheckpointJournal(file, resume=True).records) == [0, 2]
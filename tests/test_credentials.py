@@ -0,0 +1,34 @@
+import pickle
+
+from credentials import (
+    Credential,
+    CredentialSet,
+)
+from key_derivation.path import mnemonic_and_path_to_key
+from utils.bls import bls_priv_to_pub
+from utils.crypto import SHA256
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_credential_set_matches_path_derivation():
+    credentials = CredentialSet.derive(test_mnemonic, '', 2, start_index=3)
+    assert [credential.index for credential in credentials] == [3, 4]
+    credential = credentials[1]
+    assert credential.path('signing') == 'm/12381/3600/4/0/0'
+    assert credential.path('withdrawal') == 'm/12381/3600/4/0'
+    for cred_type in ('signing', 'withdrawal'):
+        sk = mnemonic_and_path_to_key(test_mnemonic, '', credential.path(cred_type))
+        assert credential.sk(cred_type) == sk.to_bytes(32, 'big')
+
+
+def test_credential_pubkeys_are_lazy_and_cached():
+    credential = Credential(0, signing_sk=1, withdrawal_sk=2)
+    assert credential.cached_pubkey('signing') is None
+    assert credential.pubkey('withdrawal') == bls_priv_to_pub(2)
+    assert credential.withdrawal_credentials == SHA256(bls_priv_to_pub(2))
+    copy = pickle.loads(pickle.dumps(credential))
+    assert copy.cached_pubkey('withdrawal') == credential.pubkey('withdrawal')
+    credential.wipe()
+    assert credential.sk('signing') == bytes(32)
+    assert copy.sk_int('signing') == 1
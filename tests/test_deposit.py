@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+import deposit
+from deposit import (
+    DepositDataWriter,
+    calculate_credentials,
+    generate_deposits,
+    save_deposit_data,
+)
+from keystores import Pbkdf2Keystore
+from utils.bls import bls_priv_to_pub
+from utils.parallel import worker_count
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_worker_count_is_memory_bounded():
+    assert worker_count(max_workers=4) == 4
+    assert worker_count(memory_per_task=2**80, max_workers=4) == 1
+
+
+def test_generate_deposits_matches_phased(tmp_path):
+    credentials = calculate_credentials(test_mnemonic, '', 2)
+    save_deposit_data(credentials, file=str(tmp_path / 'phased.json'))
+    generate_deposits(test_mnemonic, '', 2, {'signing': 'testpassword'}, folder=str(tmp_path) + '/',
+                      file=str(tmp_path / 'deposit_data.json'), keystore_cls=Pbkdf2Keystore, num_workers=2)
+    assert (tmp_path / 'deposit_data.json').read_text() == (tmp_path / 'phased.json').read_text()
+    for credential in credentials:
+        keystore_file = tmp_path / ('signing-keystore-%s.json' % credential.path('signing').replace('/', '_'))
+        keystore = Pbkdf2Keystore.open(str(keystore_file))
+        assert keystore.decrypt('testpassword') == credential.sk('signing')
+        assert keystore.pubkey == bls_priv_to_pub(credential.sk_int('signing')).hex()
+
+
+def test_parallel_deposit_data_matches_serial(tmp_path):
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 3), file=str(tmp_path / 'serial.json'), num_workers=1)
+    credentials = calculate_credentials(test_mnemonic, '', 3)
+    save_deposit_data(credentials, file=str(tmp_path / 'parallel.json'), num_workers=2)
+    assert (tmp_path / 'parallel.json').read_text() == (tmp_path / 'serial.json').read_text()
+    assert all(credential.cached_pubkey('signing') and credential.cached_pubkey('withdrawal')
+               for credential in credentials)
+
+
+def test_interrupted_writer_keeps_the_previous_file(tmp_path):
+    file = str(tmp_path / 'deposit_data.json')
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 2), file=file)
+    content = (tmp_path / 'deposit_data.json').read_text()
+    with pytest.raises(KeyboardInterrupt):
+        with DepositDataWriter(file) as writer:
+            writer.write(json.loads(content)[0])
+            raise KeyboardInterrupt
+    assert (tmp_path / 'deposit_data.json').read_text() == content
+    assert not os.path.exists(file + '.tmp')
+
+
+def test_generate_deposits_shares_worker_budget(tmp_path, monkeypatch):
+    pools = []
+    imap_bounded = deposit.imap_bounded
+
+    def recording_imap_bounded(fn, iterable, *, num_workers, **kwargs):
+        pools.append(num_workers)
+        return imap_bounded(fn, iterable, num_workers=1, **kwargs)
+
+    monkeypatch.setattr(deposit, 'imap_bounded', recording_imap_bounded)
+    generate_deposits(test_mnemonic, '', 1, {'signing': 'testpassword'}, folder=str(tmp_path) + '/',
+                      file=str(tmp_path / 'deposit_data.json'), keystore_cls=Pbkdf2Keystore, num_workers=8)
+    assert sorted(pools) == [2, 6]
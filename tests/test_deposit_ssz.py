@@ -0,0 +1,54 @@
+import os
+
+import pytest
+import ssz
+
+from deposit import (
+    calculate_credentials,
+    iter_deposit_data,
+    save_deposit_data,
+)
+from deposit_ssz import (
+    SszDepositData,
+    SszDepositDataWriter,
+    json_to_ssz,
+    ssz_to_json,
+)
+from utils.containers import DepositData
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_ssz_deposit_data_round_trip(tmp_path):
+    json_file, ssz_file = str(tmp_path / 'deposit_data.json'), str(tmp_path / 'deposit_data.ssz')
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 3), file=ssz_file)
+    entries = list(iter_deposit_data(ssz_file))
+    assert ssz_to_json(ssz_file, json_file) == 3
+    assert list(iter_deposit_data(json_file)) == entries
+
+    json_to_ssz(json_file, str(tmp_path / 'converted.ssz'))
+    with open(ssz_file, 'rb') as f, open(str(tmp_path / 'converted.ssz'), 'rb') as g:
+        assert f.read() == g.read()
+
+    with SszDepositData(ssz_file) as deposit_data:
+        assert len(deposit_data) == 3
+        deposits = [DepositData(**{name: bytes.fromhex(value) if isinstance(value, str) else value
+                                   for name, value in entry.items() if name != 'deposit_data_root'})
+                    for entry in entries]
+        assert bytes(deposit_data.records()) == ssz.encode(deposits, ssz.List(DepositData, 2**32))
+        assert bytes(deposit_data.record(-1)) == ssz.encode(deposits[2])
+        assert bytes(deposit_data.root(1)) == deposits[1].hash_tree_root
+        assert deposit_data.field(0, 'pubkey').hex() == entries[0]['pubkey']
+        assert deposit_data.entry(2) == entries[2]
+
+
+def test_interrupted_writer_keeps_the_previous_file(tmp_path):
+    file = str(tmp_path / 'deposit_data.ssz')
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 2), file=file)
+    entries = list(iter_deposit_data(file))
+    with pytest.raises(KeyboardInterrupt):
+        with SszDepositDataWriter(file) as writer:
+            writer.write(entries[0])
+            raise KeyboardInterrupt
+    assert list(iter_deposit_data(file)) == entries
+    assert not os.path.exists(file + '.tmp')
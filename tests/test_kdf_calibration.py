@@ -0,0 +1,54 @@
+import pytest
+
+from kdf_calibration import (
+    calibrate,
+    calibrate_scrypt,
+    save_kdf_profile,
+)
+from keystores import (
+    MIN_SCRYPT_N,
+    Pbkdf2Keystore,
+    ScryptKeystore,
+    check_kdf_profile,
+    load_kdf_profile,
+)
+
+
+def test_calibrated_params_respect_limits():
+    profile = calibrate(0.05, 8 * 2**20, min_scrypt_n=2**10, min_pbkdf2_c=2**10)
+    scrypt, pbkdf2 = profile['kdfs']['scrypt'], profile['kdfs']['pbkdf2']
+    assert 2**10 <= scrypt['params']['n'] <= 2**13
+    assert scrypt['memory_bytes'] <= 8 * 2**20
+    assert pbkdf2['params']['c'] >= 2**10
+    # A floor above the target latency wins, one above the memory ceiling is refused
+    assert calibrate_scrypt(0.0, 2**30, min_n=2**12)['params']['n'] == 2**12
+    with pytest.raises(ValueError):
+        calibrate_scrypt(1.0, 2**20, min_n=2**12)
+
+
+def test_keystores_use_kdf_profile(tmp_path):
+    file = str(tmp_path / 'kdf_profile.json')
+    save_kdf_profile(file, calibrate(0.01, 2**20, min_scrypt_n=2**10, min_pbkdf2_c=2**10))
+    with pytest.raises(ValueError):
+        load_kdf_profile(file)
+    profile = load_kdf_profile(file, allow_weak=True)
+    keystore = ScryptKeystore.encrypt(secret=bytes(32), password='testpassword', pubkey=bytes(48),
+                                      kdf_profile=profile)
+    assert keystore.crypto.kdf.params['n'] == profile['kdfs']['scrypt']['params']['n']
+    assert keystore.decrypt('testpassword') == bytes(32)
+    keystore = Pbkdf2Keystore.encrypt(secret=bytes(32), password='testpassword', pubkey=bytes(48),
+                                      kdf_profile=profile, kdf_params={'c': 2**11})
+    assert keystore.crypto.kdf.params['c'] == 2**11
+
+
+def test_kdf_profile_checks():
+    profile = calibrate(0.0, 2**30)
+    assert profile['kdfs']['scrypt']['params']['n'] == MIN_SCRYPT_N
+    check_kdf_profile(profile)
+    for function, params in (('scrypt', {'n': 2}), ('scrypt', {'r': 1}), ('scrypt', {'dklen': 16}),
+                             ('pbkdf2', {'c': 1000}), ('pbkdf2', {'prf': 'hmac-sha1'})):
+        weak = {**profile, 'kdfs': {function: {'params': {**profile['kdfs'][function]['params'], **params}}}}
+        with pytest.raises(ValueError):
+            check_kdf_profile(weak)
+    check_kdf_profile({**profile, 'kdfs': {'scrypt': {'params': {'n': 2**10, 'r': 8, 'p': 1, 'dklen': 32}}}},
+                      allow_weak=True)
@@ -0,0 +1,68 @@
+from json import load
+
+import pytest
+
+import key_derivation.engine
+from key_derivation.engine import DerivationEngine
+from key_derivation.path import mnemonic_and_path_to_key
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+test_paths = ['m/12381/3600/%s/0' % i for i in range(3)] + ['m/12381/3600/%s/0/0' % i for i in range(3)]
+
+
+def test_derive_matches_path_derivation():
+    engine = DerivationEngine(mnemonic=test_mnemonic, password='')
+    for path in test_paths[2:4]:
+        assert engine.derive(path) == mnemonic_and_path_to_key(test_mnemonic, '', path)
+
+
+def test_derive_many_computes_each_node_once(monkeypatch):
+    calls = []
+
+    def counting_derive_child_SK(*, parent_SK, index):
+        calls.append((parent_SK, index))
+        return derive_child_SK(parent_SK=parent_SK, index=index)
+
+    derive_child_SK = key_derivation.engine.derive_child_SK
+    monkeypatch.setattr(key_derivation.engine, 'derive_child_SK', counting_derive_child_SK)
+    engine = DerivationEngine(mnemonic=test_mnemonic, password='')
+    sks = engine.derive_many(test_paths + test_paths[:1])
+    # m/12381, m/12381/3600, and i, i/0, i/0/0 for each of the 3 validators
+    assert len(calls) == 11
+    assert sks[-1] == sks[0]
+    assert engine.derive(test_paths[-1]) == sks[len(test_paths) - 1]
+    assert len(calls) == 11
+
+
+def test_cache_is_bounded_and_zeroed():
+    engine = DerivationEngine(mnemonic=test_mnemonic, password='', cache_size=4)
+    engine.derive_many(test_paths)
+    assert len(engine._cache) == 4
+    cached = list(engine._cache.values())
+    engine.close()
+    assert len(engine._cache) == 0
+    assert all(sk == bytes(32) for sk in cached)
+    assert engine._master_SK == bytes(32)
+
+
+def test_from_seed_matches_eip2333_vectors():
+    with open('tests/test_key_derivation/test_vectors/tree_kdf.json', 'r') as f:
+        tests = load(f)['kdf_tests']
+    for test in tests:
+        with DerivationEngine.from_seed(bytes.fromhex(test['seed'])) as engine:
+            assert engine.master_SK == test['master_SK']
+            assert engine.derive_many([(test['child_index'],)]) == [test['child_SK']]
+        assert engine.master_SK == 0
+
+
+def test_mnemonic_password_is_honoured():
+    path = test_paths[0]
+    with DerivationEngine(mnemonic=test_mnemonic, password='TREZOR') as engine:
+        assert engine.derive(path) == mnemonic_and_path_to_key(test_mnemonic, 'TREZOR', path)
+        assert engine.derive(path) != mnemonic_and_path_to_key(test_mnemonic, '', path)
+
+
+def test_failed_construction_closes_quietly():
+    with pytest.raises(TypeError):
+        DerivationEngine(mnemonic=None, password='')
+    DerivationEngine.__new__(DerivationEngine).close()
@@ -1,7 +1,11 @@
 from json import load
 from key_derivation.mnemonic import (
+    candidate_mnemonics,
     get_seed,
     get_mnemonic,
+    get_word,
+    get_word_index,
+    validate_mnemonic,
 )
 
 with open('tests/test_key_derivation/test_vectors/mnemonic.json', 'r') as f:
@@ -16,3 +20,29 @@ def test_bip39():
 
         assert get_mnemonic(test_entropy) == test_mnemonic
         assert get_seed(mnemonic=test_mnemonic, password='TREZOR') == test_seed
+
+
+def test_word_indices():
+    assert get_word_index(get_word(2047)) == 2047
+    assert get_word_index('abandon') == 0
+
+
+def test_validate_mnemonic():
+    for test in test_vectors:
+        assert validate_mnemonic(test[1])
+    words = test_vectors[0][1].split()
+    assert not validate_mnemonic(' '.join(words[:-1] + [get_word(get_word_index(words[-1]) ^ 1)]))
+    assert not validate_mnemonic(' '.join(words[:-1]))
+
+
+def test_candidate_mnemonics():
+    mnemonic = test_vectors[14][1]
+    words = mnemonic.split()
+    candidates = list(candidate_mnemonics([None] + words[1:]))
+    assert mnemonic in candidates
+    assert len(candidates) == len(set(candidates))
+    assert all(validate_mnemonic(candidate) for candidate in candidates)
+
+    swapped = [words[1], words[0]] + words[2:]
+    assert not validate_mnemonic(' '.join(swapped))
+    assert mnemonic in candidate_mnemonics(swapped, swaps=True)
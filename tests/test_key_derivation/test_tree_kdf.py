@@ -1,6 +1,7 @@
 from key_derivation.tree import (
     derive_child_SK,
     derive_master_SK,
+    derive_child_SKs,
 )
 
 from json import load
@@ -22,3 +23,10 @@ def test_derive_child_SK():
         index = test['child_index']
         child_SK = test['child_SK']
         assert derive_child_SK(parent_SK=parent_SK, index=index) == child_SK
+
+
+def test_derive_child_SKs():
+    parent_SKs = [test['master_SK'] for test in test_vectors]
+    indices = [test['child_index'] for test in test_vectors]
+    child_SKs = [test['child_SK'] for test in test_vectors]
+    assert derive_child_SKs(parent_SKs=parent_SKs, indices=indices) == child_SKs
@@ -0,0 +1,39 @@
+import os
+
+from keystore_index import KeystoreIndex
+from keystores import (
+    Keystore,
+    Pbkdf2Keystore,
+    to_bytes,
+)
+
+
+def save_test_keystore(folder, i):
+    keystore = Pbkdf2Keystore.encrypt(secret=(i + 1).to_bytes(32, 'big'), password='testpassword',
+                                      path='m/12381/3600/%s/0/0' % i, pubkey=bytes([i]) * 48,
+                                      kdf_params={'c': 2**10})
+    keystore.save(str(folder / ('keystore-%s.json' % i)))
+    return keystore
+
+
+def test_to_bytes_only_converts_lowercase_hex():
+    assert to_bytes({'salt': 'ab01', 'prf': 'hmac-sha256', 'upper': 'AB', 'empty': ''}) == {
+        'salt': b'\xab\x01', 'prf': 'hmac-sha256', 'upper': 'AB', 'empty': b''}
+
+
+def test_index_lookups_and_incremental_refresh(tmp_path):
+    keystores = [save_test_keystore(tmp_path, i) for i in range(3)]
+    (tmp_path / 'deposit_data.json').write_text('[]')
+    index = KeystoreIndex(str(tmp_path))
+    assert sorted(index.refresh()) == ['deposit_data.json', 'keystore-0.json', 'keystore-1.json', 'keystore-2.json']
+    assert index.find_by_pubkey(keystores[1].pubkey).as_json() == keystores[1].as_json()
+    assert index.find_by_path('m/12381/3600/2/0/0').decrypt('testpassword') == (3).to_bytes(32, 'big')
+    assert index.find_by_pubkey('00' * 47) is None
+
+    reopened = KeystoreIndex(str(tmp_path))
+    assert reopened.refresh() == []
+    os.remove(str(tmp_path / 'keystore-0.json'))
+    new_keystore = save_test_keystore(tmp_path, 3)
+    assert reopened.find_by_pubkey(new_keystore.pubkey).as_json() == new_keystore.as_json()
+    assert reopened.file_of(keystores[0].pubkey) is None
+    assert isinstance(reopened.find_by_pubkey(keystores[2].pubkey), Keystore)
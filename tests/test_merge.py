@@ -0,0 +1,95 @@
+from argparse import ArgumentTypeError
+import os
+import subprocess
+import sys
+
+import pytest
+
+from deposit import (
+    calculate_credentials,
+    generate_deposits,
+    save_deposit_data,
+)
+from kdf_calibration import (
+    calibrate,
+    save_kdf_profile,
+)
+from keystores import Pbkdf2Keystore
+from merge import merge_deposit_data
+from shards import (
+    parse_shard,
+    save_manifest,
+    shard_range,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_shard_range_partitions_validators():
+    shards = [shard_range(5, 10, k, 3) for k in range(3)]
+    assert [len(indices) for indices in shards] == [4, 3, 3]
+    assert [i for indices in shards for i in indices] == list(range(5, 15))
+
+
+def generate_shard(tmp_path, shard, num_shards, num_validators=3):
+    indices = shard_range(0, num_validators, shard, num_shards)
+    file = str(tmp_path / ('deposit_data-shard-%s-of-%s.json' % (shard, num_shards)))
+    generate_deposits(test_mnemonic, '', len(indices), {'signing': 'testpassword'}, folder=str(tmp_path) + '/',
+                      file=file, keystore_cls=Pbkdf2Keystore, num_workers=1, start_index=indices.start)
+    save_manifest(file, indices, shard, num_shards)
+    return file
+
+
+def test_merge_matches_single_run(tmp_path):
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 3), file=str(tmp_path / 'single.json'))
+    files = [generate_shard(tmp_path, shard, 2) for shard in (1, 0)]
+    output = str(tmp_path / 'deposit_data.json')
+    assert merge_deposit_data(files + files[:1], output, check_signatures=False) == []
+    assert (tmp_path / 'deposit_data.json').read_text() == (tmp_path / 'single.json').read_text()
+
+
+def test_merge_rejects_missing_validators(tmp_path):
+    files = [generate_shard(tmp_path, 0, 3), generate_shard(tmp_path, 2, 3)]
+    with pytest.raises(ValueError):
+        merge_deposit_data(files, str(tmp_path / 'deposit_data.json'), check_signatures=False)
+    (tmp_path / 'deposit_data-shard-2-of-3.json.manifest').unlink()
+    with pytest.raises(ValueError):
+        merge_deposit_data(files, str(tmp_path / 'deposit_data.json'), check_signatures=False)
+
+
+def test_merge_separate_shard_runs(tmp_path):
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 3), file=str(tmp_path / 'single.json'))
+    profile = str(tmp_path / 'kdf_profile.json')
+    save_kdf_profile(profile, calibrate(0.0, 2**20, min_scrypt_n=2**10, min_pbkdf2_c=2**10))
+    runs = [subprocess.Popen([sys.executable, 'deposit.py', '--num_validators', '3', '--shard', '%s/2' % shard,
+                              '--folder', str(tmp_path), '--num_workers', '1', '--kdf_profile', profile,
+                              '--allow_weak_kdf'], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+            for shard in range(2)]
+    for run in runs:
+        run.communicate(('%s\ntestpassword\ntestpassword\n' % test_mnemonic).encode(), timeout=300)
+        assert run.returncode == 0
+    files = [str(tmp_path / ('deposit_data-shard-%s-of-2.json' % shard)) for shard in range(2)]
+    output = str(tmp_path / 'deposit_data.json')
+    subprocess.run([sys.executable, 'merge.py', *files, '--output', output], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, timeout=300)
+    assert (tmp_path / 'deposit_data.json').read_text() == (tmp_path / 'single.json').read_text()
+
+
+def test_parse_shard():
+    assert parse_shard('1/3') == (1, 3)
+    for shard in ('3/2', '-1/2', 'foo', '1/2/3'):
+        with pytest.raises(ArgumentTypeError):
+            parse_shard(shard)
+
+
+def test_failed_merge_keeps_previous_output(tmp_path):
+    files = [generate_shard(tmp_path, shard, 2) for shard in range(2)]
+    output = tmp_path / 'deposit_data.json'
+    assert merge_deposit_data(files, str(output), check_signatures=False) == []
+    merged = output.read_text()
+    (tmp_path / 'deposit_data-shard-1-of-2.json.manifest').unlink()
+    run = subprocess.run([sys.executable, 'merge.py', *files, '--output', str(output), '--skip_signatures'],
+                         cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
+    assert run.returncode == 1 and b'no manifest' in run.stdout and not run.stderr
+    assert output.read_text() == merged
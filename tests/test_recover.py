@@ -0,0 +1,18 @@
+from json import load
+
+from credentials import CredentialSet
+from key_derivation.mnemonic import candidate_mnemonics
+from recover import recover_mnemonic
+
+with open('tests/test_key_derivation/test_vectors/mnemonic.json', 'r') as f:
+    test_mnemonic = load(f)['english'][14][1]
+
+
+def test_recover_mnemonic():
+    credential = CredentialSet.derive(test_mnemonic, 'pwd', 1, start_index=1)[0]
+    words = test_mnemonic.split()
+    candidates = candidate_mnemonics(words[:5] + [None] + words[6:])
+    assert recover_mnemonic(candidates, 'pwd', credential.pubkey('withdrawal'), index=1,
+                            num_workers=1) == test_mnemonic
+    candidates = candidate_mnemonics(words[:5] + [None] + words[6:])
+    assert recover_mnemonic(candidates, '', credential.pubkey('signing'), index=1, num_workers=1) is None
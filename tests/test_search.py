@@ -0,0 +1,29 @@
+from credentials import CredentialSet
+from search import (
+    derive_coin_type_SK,
+    load_pubkey_map,
+    save_pubkey_map,
+    search_pubkeys,
+)
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_search_pubkeys(tmp_path):
+    credentials = CredentialSet.derive(test_mnemonic, '', 4)
+    signing, withdrawal = credentials[1].pubkey('signing'), credentials[2].pubkey('withdrawal')
+    coin_type_SK = derive_coin_type_SK(test_mnemonic, '')
+    pubkey_map = {}
+    found, scanned = search_pubkeys(coin_type_SK, [signing, withdrawal], 0, 10, pubkey_map=pubkey_map,
+                                    num_workers=1, chunk_size=2)
+    assert found == {signing: (1, 'signing'), withdrawal: (2, 'withdrawal')}
+    assert scanned == 4  # Stops after the chunk holding the last target
+    assert pubkey_map[credentials[3].pubkey('withdrawal').hex()] == (3, 'withdrawal')
+
+    found, scanned = search_pubkeys(coin_type_SK, [signing], 2, 2, cred_types=['signing'], num_workers=1)
+    assert (found, scanned) == ({}, 2)
+
+    map_file = str(tmp_path / 'pubkeys.json')
+    assert load_pubkey_map(map_file) == {}
+    save_pubkey_map(map_file, pubkey_map)
+    assert load_pubkey_map(map_file) == pubkey_map
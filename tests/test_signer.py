@@ -0,0 +1,121 @@
+import asyncio
+import os
+import socket
+import stat
+
+import pytest
+
+from keystores import Pbkdf2Keystore
+import signer
+from signer import (
+    SignerClient,
+    SigningService,
+    secrets_by_pubkey,
+    serve,
+)
+from utils.bls import (
+    bls_priv_to_pub,
+    bls_sign,
+)
+
+test_sks = [1, 2]
+
+
+def test_secrets_by_pubkey(tmp_path):
+    for sk in test_sks:
+        keystore = Pbkdf2Keystore.encrypt(secret=sk.to_bytes(32, 'big'), password='testpassword',
+                                          kdf_params={'c': 2**10}, pubkey=bls_priv_to_pub(sk) if sk == 1 else b'')
+        keystore.save(str(tmp_path / ('keystore-%s.json' % sk)))
+    assert secrets_by_pubkey(str(tmp_path), 'testpassword', num_workers=1) == {
+        bls_priv_to_pub(sk): sk for sk in test_sks}
+
+
+def test_signing_service(tmp_path):
+    socket_path = str(tmp_path / 'signer.sock')
+    secrets = {bls_priv_to_pub(sk): sk for sk in test_sks}
+    pubkey = bls_priv_to_pub(1)
+
+    async def run():
+        async with SigningService(secrets, num_workers=0, batch_delay=0.01) as service:
+            ready = asyncio.Event()
+            serving = asyncio.ensure_future(serve(service, socket_path, ready=ready))
+            await ready.wait()
+            try:
+                async with SignerClient(socket_path) as client:
+                    assert sorted(await client.pubkeys()) == sorted(secrets)
+                    signatures = await asyncio.gather(
+                        client.sign(pubkey, bytes(32)), client.sign(pubkey, bytes(32)),
+                        client.sign(bls_priv_to_pub(2), bytes(32)))
+                    with pytest.raises(ValueError):
+                        await client.sign(bytes(48), bytes(32))
+                    with pytest.raises(ValueError):
+                        await client.sign(pubkey, bytes(31))
+                    stats = await client.stats()
+            finally:
+                serving.cancel()
+                await asyncio.gather(serving, return_exceptions=True)
+        return signatures, stats
+
+    signatures, stats = asyncio.run(run())
+    assert signatures == [bls_sign(1, bytes(32))] * 2 + [bls_sign(2, bytes(32))]
+    assert (stats['signatures'], stats['coalesced'], stats['batches'], stats['errors']) == (2, 1, 1, 2)
+
+
+def test_secrets_by_pubkey_rejects_wrong_pubkey(tmp_path):
+    keystore = Pbkdf2Keystore.encrypt(secret=(1).to_bytes(32, 'big'), password='testpassword',
+                                      kdf_params={'c': 2**10}, pubkey=bls_priv_to_pub(2))
+    keystore.save(str(tmp_path / 'keystore.json'))
+    with pytest.raises(ValueError):
+        secrets_by_pubkey(str(tmp_path), 'testpassword', num_workers=1)
+
+
+def test_failed_and_closed_requests(monkeypatch):
+    secrets = {bls_priv_to_pub(sk): sk for sk in test_sks}
+    responses = []
+
+    class Writer:
+        def write(self, data):
+            responses.append(data)
+
+    def failing_sign_batch(requests):
+        raise RuntimeError('backend failure')
+
+    async def run():
+        async with SigningService(secrets, num_workers=0, batch_delay=0.01) as service:
+            monkeypatch.setattr(signer, '_sign_batch', failing_sign_batch)
+            request = {'id': 1, 'method': 'sign', 'pubkey': bls_priv_to_pub(1).hex(), 'message': bytes(32).hex()}
+            await asyncio.gather(service._respond(request, Writer()), service._respond(request, Writer()))
+            errors = service.stats.errors
+            service.batch_delay = 60
+            pending = asyncio.ensure_future(service.sign(bls_priv_to_pub(2), bytes(32)))
+            await asyncio.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pending, 1)
+        return errors
+
+    assert asyncio.run(run()) == 2
+    assert all(b'backend failure' in response for response in responses)
+
+
+def test_serve_socket_permissions(tmp_path):
+    socket_path = str(tmp_path / 'signer.sock')
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(socket_path)
+    stale.close()
+
+    async def run():
+        async with SigningService({}, num_workers=0) as service:
+            ready = asyncio.Event()
+            serving = asyncio.ensure_future(serve(service, socket_path, ready=ready))
+            await ready.wait()
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+            with open(socket_path, 'w') as f:
+                f.write('not a socket')
+            with pytest.raises(FileExistsError):
+                await serve(service, socket_path)
+        return mode
+
+    assert asyncio.run(run()) == 0o600
+    assert (tmp_path / 'signer.sock').read_text() == 'not a socket'
@@ -0,0 +1,37 @@
+import pytest
+
+from utils import bls
+from utils.bls import (
+    PyEccBackend,
+    available_backends,
+    conforms_to_reference,
+)
+
+test_privkeys = [1, 2**250 + 12345]
+test_messages = [b'\x00' * 32, b'\x12' * 32]
+reference = PyEccBackend()
+accelerated_backends = [backend for name, backend in available_backends().items() if name != reference.name]
+
+
+def test_reference_known_answer():
+    assert conforms_to_reference(reference)
+
+
+@pytest.mark.parametrize('backend', accelerated_backends, ids=lambda backend: backend.name)
+def test_backend_conformance(backend):
+    for privkey in test_privkeys:
+        pubkey = reference.priv_to_pub(privkey)
+        assert backend.priv_to_pub(privkey) == pubkey
+        for message in test_messages:
+            signature = reference.sign(privkey, message)
+            assert backend.sign(privkey, message) == signature
+            assert backend.verify(pubkey, message, signature)
+            assert not backend.verify(pubkey, message[::-1], signature)
+
+
+def test_backend_selected_by_environment(monkeypatch):
+    monkeypatch.setenv(bls.BLS_BACKEND_ENV_VAR, 'py_ecc')
+    assert isinstance(bls.select_backend(), PyEccBackend)
+    monkeypatch.setenv(bls.BLS_BACKEND_ENV_VAR, 'unknown')
+    with pytest.raises(KeyError):
+        bls.select_backend()
@@ -0,0 +1,20 @@
+from random import Random
+
+from Crypto.Hash import SHA256 as _sha256
+from Crypto.Protocol.KDF import HKDF as _HKDF
+
+from utils.crypto import (
+    HKDF,
+    HKDF_many,
+)
+
+rng = Random(2333)
+
+
+def test_HKDF_matches_pycryptodome():
+    for salt in (b'', bytes(4), b'BLS-SIG-KEYGEN-SALT-', rng.randbytes(32)):
+        IKMs = [rng.randbytes(32), rng.randbytes(64)]
+        for L in (1, 32, 48, 100, 8160):
+            expected = [_HKDF(master=IKM, key_len=L, salt=salt, hashmod=_sha256) for IKM in IKMs]
+            assert HKDF(salt=salt, IKM=IKMs[0], L=L) == expected[0]
+            assert HKDF_many(salt=salt, IKMs=IKMs, L=L) == expected
@@ -0,0 +1,43 @@
+from random import Random
+
+import pytest
+
+from utils.bls import (
+    compute_domain,
+    compute_signing_root,
+)
+from utils.containers import (
+    DepositData,
+    DepositMessage,
+)
+from utils.deposit_roots import DepositRoots
+from utils.merkle_minimal import merkleize_chunks
+
+rng = Random(3600)
+
+
+def test_deposit_roots_match_ssz():
+    domain = compute_domain(fork_version=bytes.fromhex('00000001'))
+    for amount in (0, 1, 32 * 10**9, 2**64 - 1):
+        pubkey, withdrawal_credentials, signature = rng.randbytes(48), rng.randbytes(32), rng.randbytes(96)
+        deposit_message = DepositMessage(pubkey=pubkey, withdrawal_credentials=withdrawal_credentials, amount=amount)
+        deposit = DepositData(**deposit_message.as_dict(), signature=signature)
+        roots = DepositRoots(pubkey, withdrawal_credentials, amount)
+        assert roots.message_root == deposit_message.hash_tree_root
+        assert roots.signing_root() == compute_signing_root(deposit_message, compute_domain())
+        assert roots.signing_root(domain) == compute_signing_root(deposit_message, domain)
+        assert roots.data_root(signature) == deposit.hash_tree_root
+
+        chunks = [pubkey[:32], pubkey[32:] + bytes(16), signature[:32], signature[32:64], signature[64:]]
+        fields = [merkleize_chunks(chunks[:2]), withdrawal_credentials, amount.to_bytes(32, 'little'),
+                  merkleize_chunks(chunks[2:])]
+        assert roots.data_root(signature) == merkleize_chunks(fields)
+
+
+def test_deposit_roots_reject_malformed_fields():
+    with pytest.raises(ValueError):
+        DepositRoots(bytes(47), bytes(32), 1)
+    with pytest.raises(ValueError):
+        DepositRoots(bytes(48), bytes(32), 2**64)
+    with pytest.raises(ValueError):
+        DepositRoots(bytes(48), bytes(32), 1).data_root(bytes(95))
@@ -0,0 +1,30 @@
+from deposit import generate_deposits
+from key_derivation.tree import derive_child_SK
+from keystores import Pbkdf2Keystore
+from utils import instrumentation
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    derive_child_SK(parent_SK=1, index=0)
+    assert instrumentation.snapshot() == {'timers': {}, 'counters': {}}
+
+
+def test_counts_primitives_and_worker_stages(tmp_path):
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        derive_child_SK(parent_SK=1, index=0)
+        assert instrumentation.snapshot()['counters'] == {'key_derivation.lamport_SKs.bytes': 2 * 8160}
+        generate_deposits(test_mnemonic, '', 2, {'signing': 'testpassword'}, folder=str(tmp_path) + '/',
+                          file=str(tmp_path / 'deposit_data.json'), keystore_cls=Pbkdf2Keystore, num_workers=2)
+        timers = instrumentation.snapshot()['timers']
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    # Signing and encryption ran in worker processes
+    assert timers['stage.sign']['calls'] == timers['stage.encrypt']['calls'] == 2
+    assert timers['keystores.encrypt']['calls'] == timers['bls.sign']['calls'] == 2
+    assert timers['stage.derive']['calls'] == timers['stage.write']['calls'] == 2
@@ -0,0 +1,92 @@
+from random import Random
+import threading
+
+from utils.crypto import SHA256
+from utils.merkle_minimal import (
+    MerkleAccumulator,
+    _ZeroHashes,
+    calc_merkle_tree_from_leaves,
+    get_merkle_proof,
+    get_merkle_root,
+    merkleize_chunks,
+    zerohashes,
+)
+
+rng = Random(12381)
+test_leaf_counts = [0, 1, 2, 3, 4, 5, 8, 13, 31, 32, 33, 100]
+
+
+def is_valid_merkle_branch(leaf: bytes, branch, depth: int, index: int, root: bytes) -> bool:
+    value = leaf
+    for i in range(depth):
+        if index // (2**i) % 2:
+            value = SHA256(branch[i] + value)
+        else:
+            value = SHA256(value + branch[i])
+    return value == root
+
+
+def test_accumulator_matches_full_tree():
+    for count in test_leaf_counts:
+        leaves = [rng.getrandbits(256).to_bytes(32, 'big') for _ in range(count)]
+        accumulator = MerkleAccumulator()
+        for leaf in leaves:
+            accumulator.append(leaf)
+        root = accumulator.get_root()
+        assert root == get_merkle_root(leaves, pad_to=2**32)
+        assert root == merkleize_chunks(leaves, pad_to=2**32)
+        assert accumulator.get_deposit_root() == SHA256(root + count.to_bytes(32, 'little'))
+        tree = calc_merkle_tree_from_leaves(leaves)
+        for index in range(count):
+            proof = accumulator.get_proof(index)
+            assert proof[:32] == get_merkle_proof(tree, index)
+            assert is_valid_merkle_branch(leaves[index], proof, 33, index, accumulator.get_deposit_root())
+
+
+def test_accumulator_snapshot(tmp_path):
+    accumulator = MerkleAccumulator()
+    for _ in range(21):
+        accumulator.append(rng.getrandbits(256).to_bytes(32, 'big'))
+    accumulator.save(str(tmp_path / 'accumulator.bin'))
+    restored = MerkleAccumulator.open(str(tmp_path / 'accumulator.bin'))
+    assert restored.get_deposit_root() == accumulator.get_deposit_root()
+    leaf = rng.getrandbits(256).to_bytes(32, 'big')
+    accumulator.append(leaf)
+    restored.append(leaf)
+    assert restored.get_proof(21) == accumulator.get_proof(21)
+
+
+def test_layer_engine_matches_pairwise_hashing():
+    def pairwise_root(leaves, height):
+        for h in range(height):
+            leaves = leaves + [zerohashes[h]] * (len(leaves) % 2)
+            leaves = [SHA256(leaves[i] + leaves[i + 1]) for i in range(0, len(leaves), 2)]
+        return leaves[0]
+
+    for count in test_leaf_counts[1:]:
+        leaves = [rng.getrandbits(256).to_bytes(32, 'big') for _ in range(count)]
+        depth = (count - 1).bit_length()
+        assert merkleize_chunks(leaves) == pairwise_root(leaves, depth)
+        assert merkleize_chunks(leaves, pad_to=2**10) == get_merkle_root(leaves, pad_to=2**10)
+        assert get_merkle_root(leaves, pad_to=2**10) == pairwise_root(leaves, 10)
+        tree = calc_merkle_tree_from_leaves(leaves, layer_count=depth)
+        assert list(tree[0]) == leaves and tree[-1][-1] == merkleize_chunks(leaves)
+        assert tree[0][1:-1] == leaves[1:-1] and tree[0][::-3] == leaves[::-3]
+    assert zerohashes[64] == SHA256(zerohashes[63] + zerohashes[63])
+
+
+def test_zerohashes_filled_concurrently():
+    for _ in range(20):
+        hashes = _ZeroHashes()
+        barrier = threading.Barrier(8)
+
+        def fill():
+            barrier.wait()
+            hashes[60]
+
+        threads = [threading.Thread(target=fill) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert hashes._hashes == [zerohashes[h] for h in range(61)]
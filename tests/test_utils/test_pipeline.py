@@ -0,0 +1,24 @@
+import pytest
+
+from utils.pipeline import staged
+
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+
+def fail_on_three(items):
+    for item in items:
+        if item == 3:
+            raise ValueError(item)
+        yield item
+
+
+def test_staged_preserves_order():
+    assert list(staged(range(100), double, double, maxsize=2)) == [4 * i for i in range(100)]
+
+
+def test_staged_reraises_stage_exception():
+    with pytest.raises(ValueError):
+        list(staged(range(10), fail_on_three, double))
@@ -0,0 +1,31 @@
+import json
+
+from deposit import (
+    calculate_credentials,
+    iter_deposit_data,
+    save_deposit_data,
+)
+from verify import verify_deposit_data
+
+test_mnemonic = 'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about'
+
+
+def test_verify_deposit_data(tmp_path):
+    file = str(tmp_path / 'deposit_data.json')
+    save_deposit_data(calculate_credentials(test_mnemonic, '', 2), file=file)
+    entries = list(iter_deposit_data(file))
+    assert list(verify_deposit_data(entries)) == []
+
+    tampered = [dict(entry) for entry in entries]
+    tampered[0]['signature'] = entries[1]['signature']
+    tampered[1]['deposit_data_root'] = entries[0]['deposit_data_root']
+    assert sorted(verify_deposit_data(tampered)) == [
+        (0, 'deposit_data_root does not match the entry'),
+        (0, 'invalid signature'),
+        (1, 'deposit_data_root does not match the entry'),
+    ]
+
+
+def test_verify_malformed_entry():
+    entry = json.loads('{"pubkey": "00", "withdrawal_credentials": "00", "amount": 1, "signature": "00"}')
+    assert [index for index, _ in verify_deposit_data([entry])] == [0]
@@ -1,28 +1,30 @@
-from py_ecc.bls import G2ProofOfPossession as _bls
-from ssz import (
-    ByteVector,
-    Serializable,
+import os
+from secrets import randbits
+from typing import (
+    Dict,
+    Optional,
+    Sequence,
+    Type,
 )
 
 from utils.typing import (
+    BLSPubkey,
+    BLSSignature,
     Domain,
     DomainType,
     Version,
     Root,
 )
+from utils.instrumentation import (
+    count,
+    timed,
+)
 from utils.constants import (
     DOMAIN_DEPOSIT,
     GENESIS_FORK_VERSION,
 )
 
 
-class SigningRoot(Serializable):
-    fields = [
-        ('object_root', ByteVector(32)),
-        ('domain', ByteVector(8))
-    ]
-
-
 def compute_domain(domain_type: DomainType=DomainType(DOMAIN_DEPOSIT),
                    fork_version: Version=GENESIS_FORK_VERSION) -> Domain:
     """
@@ -35,13 +37,222 @@ def compute_signing_root(ssz_object, domain: Domain) -> Root:
     """
     Return the signing root of an object by calculating the root of the object-domain tree.
     """
-    domain_wrapped_object = SigningRoot.create(
-        object_root=ssz_object.get_hash_tree_root(),
+    from utils.containers import SigningRoot
+    domain_wrapped_object = SigningRoot(
+        object_root=ssz_object.hash_tree_root,
         domain=domain,
     )
-    return domain_wrapped_object.get_hash_tree_root()
+    return domain_wrapped_object.hash_tree_root
+
+
+class BLSBackend:
+    """
+    A BLS12-381 proof-of-possession signature implementation.
+    """
+    name = ''
+
+    def priv_to_pub(self, privkey: int) -> BLSPubkey:
+        raise NotImplementedError
+
+    def sign(self, privkey: int, message: bytes) -> BLSSignature:
+        raise NotImplementedError
+
+    def verify(self, pubkey: BLSPubkey, message: bytes, signature: BLSSignature) -> bool:
+        raise NotImplementedError
+
+    def batch_verify(self, pubkeys: Sequence[BLSPubkey], messages: Sequence[bytes],
+                     signatures: Sequence[BLSSignature]) -> bool:
+        """
+        Return whether every signature is valid for its pubkey and message.
+        """
+        return all(self.verify(*args) for args in zip(pubkeys, messages, signatures))
+
+
+class PyEccBackend(BLSBackend):
+    """
+    The pure-Python reference implementation.
+    """
+    name = 'py_ecc'
+
+    def __init__(self) -> None:
+        from py_ecc.bls import G2ProofOfPossession
+        self._bls = G2ProofOfPossession
+
+    def priv_to_pub(self, privkey: int) -> BLSPubkey:
+        return self._bls.PrivToPub(privkey)
+
+    def sign(self, privkey: int, message: bytes) -> BLSSignature:
+        return self._bls.Sign(privkey, message)
+
+    def verify(self, pubkey: BLSPubkey, message: bytes, signature: BLSSignature) -> bool:
+        return self._bls.Verify(pubkey, message, signature)
+
+    def batch_verify(self, pubkeys: Sequence[BLSPubkey], messages: Sequence[bytes],
+                     signatures: Sequence[BLSSignature]) -> bool:
+        """
+        Randomized batch verification: with a random 64-bit scalar r_i per signature, check
+        e(-G1, sum(r_i * S_i)) * prod(e(H(m_i), r_i * P_i)) == 1 using a single final exponentiation.
+        """
+        from eth_utils import ValidationError
+        from py_ecc.bls.g2_primatives import (
+            pubkey_to_G1,
+            signature_to_G2,
+        )
+        from py_ecc.bls.hash_to_curve import hash_to_G2
+        from py_ecc.fields import optimized_bls12_381_FQ12 as FQ12
+        from py_ecc.optimized_bls12_381 import (
+            G1,
+            Z2,
+            add,
+            final_exponentiate,
+            multiply,
+            neg,
+            pairing,
+        )
+        assert len(pubkeys) == len(messages) == len(signatures)
+        try:
+            signature_sum = Z2
+            accumulator = FQ12.one()
+            for pubkey, message, signature in zip(pubkeys, messages, signatures):
+                r = randbits(64) | 1
+                signature_sum = add(signature_sum, multiply(signature_to_G2(signature), r))
+                message_point = hash_to_G2(message, self._bls.DST)
+                accumulator *= pairing(message_point, multiply(pubkey_to_G1(pubkey), r), final_exponentiate=False)
+            accumulator *= pairing(signature_sum, neg(G1), final_exponentiate=False)
+            return final_exponentiate(accumulator) == FQ12.one()
+        except (ValidationError, ValueError, AssertionError):
+            return False
+
+
+class MilagroBackend(BLSBackend):
+    """
+    Bindings to the Milagro (Rust) implementation, if ``milagro_bls_binding`` is installed.
+    """
+    name = 'milagro'
+
+    def __init__(self) -> None:
+        import milagro_bls_binding
+        self._bls = milagro_bls_binding
+
+    def priv_to_pub(self, privkey: int) -> BLSPubkey:
+        return BLSPubkey(self._bls.SkToPk(privkey.to_bytes(32, 'big')))
+
+    def sign(self, privkey: int, message: bytes) -> BLSSignature:
+        return BLSSignature(self._bls.Sign(privkey.to_bytes(32, 'big'), message))
+
+    def verify(self, pubkey: BLSPubkey, message: bytes, signature: BLSSignature) -> bool:
+        try:
+            return self._bls.Verify(pubkey, message, signature)
+        except ValueError:
+            return False
+
+    def batch_verify(self, pubkeys: Sequence[BLSPubkey], messages: Sequence[bytes],
+                     signatures: Sequence[BLSSignature]) -> bool:
+        try:
+            signature_sets = list(zip(signatures, pubkeys, messages))
+            return self._bls.VerifyMultipleAggregateSignatures(signature_sets)
+        except ValueError:
+            return False
+
+
+BACKENDS: Dict[str, Type[BLSBackend]] = {
+    PyEccBackend.name: PyEccBackend,
+    MilagroBackend.name: MilagroBackend,
+}
+ACCELERATED_BACKENDS = [MilagroBackend.name]  # In order of preference
+BLS_BACKEND_ENV_VAR = 'ETH2_BLS_BACKEND'
+
+# Known answer produced by the py_ecc reference, checked before an accelerated backend is selected automatically
+# as implementations of older hash-to-curve drafts produce different signatures.
+_KAT_PRIVKEY = 0x263dbd792f5b1be47ed85f8938c0f29586af0d3ac7b977f21c278fe1462040e3
+_KAT_MESSAGE = bytes.fromhex('ab' * 32)
+_KAT_PUBKEY = bytes.fromhex('a491d1b0ecd9bb917989f0e74f0dea0422eac4a873e5e2644f368dffb9a6e20f'
+                            'd6e10c1b77654d067c0618f6e5a7f79a')
+_KAT_SIGNATURE = bytes.fromhex('8a003fc37aaf1975e1e87fca3ed72ca0c1a90eff782f3b6f90a63e5328b46d9d'
+                               '81121fa9c89e9077df86c37e0a3205850708060e0b5c1dccde77fdcb0d9c31bd'
+                               '3da6f31bde39aa19b981fb2c101b8f7ea8346c18c1d14f8c52e4a17c08f02f6a')
+
+
+def load_backend(name: str) -> BLSBackend:
+    """
+    Return an instance of the backend called ``name``, raising ``ImportError`` if it is not installed.
+    """
+    return BACKENDS[name]()
+
+
+def conforms_to_reference(backend: BLSBackend) -> bool:
+    return (backend.priv_to_pub(_KAT_PRIVKEY) == _KAT_PUBKEY and
+            backend.sign(_KAT_PRIVKEY, _KAT_MESSAGE) == _KAT_SIGNATURE)
+
+
+def select_backend() -> BLSBackend:
+    """
+    Return the backend named by the ``ETH2_BLS_BACKEND`` environment variable if it is set, otherwise the
+    first installed accelerated backend that reproduces the reference known answer, otherwise py_ecc.
+    """
+    name = os.environ.get(BLS_BACKEND_ENV_VAR)
+    if name:
+        return load_backend(name)
+    for name in ACCELERATED_BACKENDS:
+        try:
+            backend = load_backend(name)
+        except ImportError:
+            continue
+        if conforms_to_reference(backend):
+            return backend
+    return PyEccBackend()
+
+
+_bls_backend: Optional[BLSBackend] = None
+
+
+def get_backend() -> BLSBackend:
+    """
+    Return the backend in use, selecting it on first use so that importing this module stays cheap.
+    """
+    global _bls_backend
+    if _bls_backend is None:
+        _bls_backend = select_backend()
+    return _bls_backend
+
+
+def set_backend(name: str) -> None:
+    """
+    Switch to the backend called ``name``, also for worker processes started after this call.
+    """
+    global _bls_backend
+    _bls_backend = load_backend(name)
+    os.environ[BLS_BACKEND_ENV_VAR] = name
+
+
+def available_backends() -> Dict[str, BLSBackend]:
+    backends = {}
+    for name in BACKENDS:
+        try:
+            backends[name] = load_backend(name)
+        except ImportError:
+            pass
+    return backends
+
+
+@timed('bls.verify')
+def bls_verify(pubkey: BLSPubkey, message: bytes, signature: BLSSignature) -> bool:
+    count('bls.pairings', 2)
+    return get_backend().verify(pubkey, message, signature)
+
+
+@timed('bls.batch_verify')
+def bls_batch_verify(pubkeys: Sequence[BLSPubkey], messages: Sequence[bytes],
+                     signatures: Sequence[BLSSignature]) -> bool:
+    count('bls.pairings', len(pubkeys) + 1)
+    return get_backend().batch_verify(pubkeys, messages, signatures)
+
+
+@timed('bls.sign')
+def bls_sign(privkey: int, message: bytes) -> BLSSignature:
+    return get_backend().sign(privkey, message)
 
 
-bls_verify = _bls.Verify
-bls_sign = _bls.Sign
-bls_priv_to_pub = _bls.PrivToPub
+@timed('bls.priv_to_pub')
+def bls_priv_to_pub(privkey: int) -> BLSPubkey:
+    return get_backend().priv_to_pub(privkey)
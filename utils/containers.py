@@ -0,0 +1,32 @@
+from ssz import (
+    ByteVector,
+    Serializable,
+    bytes32,
+    bytes48,
+    bytes96,
+    uint64,
+)
+
+
+class SigningRoot(Serializable):
+    fields = [
+        ('object_root', ByteVector(32)),
+        ('domain', ByteVector(8))
+    ]
+
+
+class DepositMessage(Serializable):
+    fields = [
+        ('pubkey', bytes48),
+        ('withdrawal_credentials', bytes32),
+        ('amount', uint64),
+    ]
+
+
+class DepositData(Serializable):
+    fields = [
+        ('pubkey', bytes48),
+        ('withdrawal_credentials', bytes32),
+        ('amount', uint64),
+        ('signature', bytes96)
+    ]
@@ -1,37 +1,99 @@
+from functools import lru_cache
+from hashlib import sha256 as _hashlib_sha256
+import hmac as _hmac
+from typing import (
+    List,
+    Sequence,
+)
 from Crypto.Hash import (
     SHA256 as _sha256,
     SHA512 as _sha512,
 )
 from Crypto.Protocol.KDF import (
     scrypt as _scrypt,
-    HKDF as _HKDF,
     PBKDF2 as _PBKDF2,
 )
 from Crypto.Cipher import (
     AES as _AES
 )
 
+from utils.instrumentation import timed
+
 
+# The hash primitives are left uninstrumented, as even a disabled timer is a measurable share of their cost; they
+# are timed through the stages that call them.
 def SHA256(x):
     return _sha256.new(x).digest()
 
 
+def SHA256_chunks(x: bytes, chunk_size: int=32) -> bytes:
+    """
+    Return the concatenated SHA256 digests of each ``chunk_size``-byte chunk of ``x``.
+    """
+    view = memoryview(x)
+    return b''.join([_hashlib_sha256(view[i:i + chunk_size]).digest() for i in range(0, len(view), chunk_size)])
+
+
+@timed('crypto.scrypt')
 def scrypt(*, password: str, salt: str, n: int, r: int, p: int, dklen: int) -> bytes:
     assert(n < 2**(128 * r / 8))
     res = _scrypt(password=password, salt=salt, key_len=dklen, N=n, r=r, p=p)
     return res if isinstance(res, bytes) else res[0]  # PyCryptodome can return Tuple[bytes]
 
 
+@timed('crypto.PBKDF2')
 def PBKDF2(*, password: str, salt: bytes, dklen: int, c: int, prf: str) -> bytes:
     assert('sha' in prf)
     _hash = _sha256 if 'sha256' in prf else _sha512
+    # PyCryptodome absorbs the HMAC pads once and runs the iterations in C from the prepared states, which
+    # measures faster than hashlib.pbkdf2_hmac here.
     res = _PBKDF2(password=password, salt=salt, dkLen=dklen, count=c, hmac_hash_module=_hash)
     return res if isinstance(res, bytes) else res[0]  # PyCryptodome can return Tuple[bytes]
 
 
+@lru_cache(maxsize=1024)
+def _salted_HMAC(salt: bytes) -> '_hmac.HMAC':
+    """
+    Return an HMAC-SHA256 keyed by ``salt``, with its inner and outer pads already absorbed, to be copied for
+    each HKDF extract under that salt. Salts are public (child indices and constants) and repeat constantly.
+    """
+    return _hmac.new(salt or bytes(32), digestmod='sha256')
+
+
+def _HKDF_expand(PRK: bytes, L: int) -> bytes:
+    expander = _hmac.new(PRK, digestmod='sha256')
+    blocks = []
+    block = b''
+    for i in range(1, -(-L // 32) + 1):
+        hmac = expander.copy()
+        hmac.update(block + bytes([i]))
+        block = hmac.digest()
+        blocks.append(block)
+    return b''.join(blocks)[:L]
+
+
+def _HKDF_many(salt: bytes, IKMs: Sequence[bytes], L: int) -> List[bytes]:
+    assert L <= 255 * 32
+    extractor = _salted_HMAC(salt)
+    OKMs = []
+    for IKM in IKMs:
+        hmac = extractor.copy()
+        hmac.update(IKM)
+        OKMs.append(_HKDF_expand(hmac.digest(), L))
+    return OKMs
+
+
+@timed('crypto.HKDF')
 def HKDF(*, salt: bytes, IKM: bytes, L: int) -> bytes:
-    res = _HKDF(master=IKM, key_len=L, salt=salt, hashmod=_sha256)
-    return res if isinstance(res, bytes) else res[0]  # PyCryptodome can return Tuple[bytes]
+    return _HKDF_many(salt, [IKM], L)[0]
+
+
+@timed('crypto.HKDF_many')
+def HKDF_many(*, salt: bytes, IKMs: Sequence[bytes], L: int) -> List[bytes]:
+    """
+    Return ``HKDF(salt=salt, IKM=IKM, L=L)`` for each of ``IKMs``, extracting from one keyed HMAC state.
+    """
+    return _HKDF_many(salt, IKMs, L)
 
 
 def AES_128_CTR(*, key: bytes, iv: bytes):
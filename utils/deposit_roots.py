@@ -0,0 +1,51 @@
+"""
+``hash_tree_root`` of the deposit containers without the generic ``ssz`` machinery. Their layouts are fixed, so
+``merkleize_chunks`` over the packed fields unrolls into the few hashes below::
+
+    DepositMessage:  H(H(pubkey_root + withdrawal_credentials) + H(amount + ZERO))
+    DepositData:     H(H(pubkey_root + withdrawal_credentials) + H(amount + signature_root))
+    SigningRoot:     H(message_root + domain)
+
+The left subtree is shared by the message and data roots and is hashed once per deposit.
+"""
+from hashlib import sha256 as _hashlib_sha256
+
+from utils.bls import compute_domain
+from utils.constants import ZERO_BYTES32
+
+DEPOSIT_DOMAIN = compute_domain()
+
+
+def _hash(left: bytes, right: bytes) -> bytes:
+    return _hashlib_sha256(left + right).digest()
+
+
+def _check_length(name: str, value: bytes, length: int) -> None:
+    if len(value) != length:
+        raise ValueError('%s is %s bytes, expected %s' % (name, len(value), length))
+
+
+class DepositRoots:
+    """
+    The roots of one deposit. The message fields are hashed on construction, so that ``signing_root`` and
+    ``data_root`` (once the message is signed) only hash what they add.
+    """
+    __slots__ = ('_amount', '_left', 'message_root')
+
+    def __init__(self, pubkey: bytes, withdrawal_credentials: bytes, amount: int) -> None:
+        _check_length('pubkey', pubkey, 48)
+        _check_length('withdrawal_credentials', withdrawal_credentials, 32)
+        if not 0 <= amount < 2**64:
+            raise ValueError('amount %s is not a uint64' % amount)
+        self._amount = amount.to_bytes(32, 'little')
+        self._left = _hash(_hash(pubkey[:32], pubkey[32:] + bytes(16)), withdrawal_credentials)
+        self.message_root = _hash(self._left, _hash(self._amount, ZERO_BYTES32))
+
+    def signing_root(self, domain: bytes=DEPOSIT_DOMAIN) -> bytes:
+        _check_length('domain', domain, 8)
+        return _hash(self.message_root, domain + bytes(24))
+
+    def data_root(self, signature: bytes) -> bytes:
+        _check_length('signature', signature, 96)
+        signature_root = _hash(_hash(signature[:32], signature[32:64]), _hash(signature[64:], ZERO_BYTES32))
+        return _hash(self._left, _hash(self._amount, signature_root))
@@ -0,0 +1,142 @@
+"""
+Counters and cumulative timers for the hot paths, switched on by ``enable``. While disabled, an instrumented
+function costs one flag check on top of the call, so the decorators can stay on the primitives permanently,
+except the hash functions themselves, which are timed through their callers.
+
+Timers are inclusive: the time of ``derive_child_SK`` also counts towards the ``HKDF`` it calls.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Iterator,
+    List,
+    Tuple,
+    TypeVar,
+)
+
+F = TypeVar('F', bound=Callable[..., Any])
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+class _State:
+    enabled = False
+
+
+_state = _State()
+_lock = Lock()
+_calls: DefaultDict[str, int] = defaultdict(int)
+_seconds: DefaultDict[str, float] = defaultdict(float)
+_counters: DefaultDict[str, int] = defaultdict(int)
+
+
+def enable() -> None:
+    _state.enabled = True
+
+
+def disable() -> None:
+    _state.enabled = False
+
+
+def is_enabled() -> bool:
+    return _state.enabled
+
+
+def reset() -> None:
+    with _lock:
+        _calls.clear()
+        _seconds.clear()
+        _counters.clear()
+
+
+def count(name: str, n: int=1) -> None:
+    if _state.enabled:
+        with _lock:
+            _counters[name] += n
+
+
+def _add_time(name: str, seconds: float) -> None:
+    with _lock:
+        _calls[name] += 1
+        _seconds[name] += seconds
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """
+    Decorator accumulating the calls to and time spent in the decorated function under ``name``.
+    """
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _add_time(name, perf_counter() - start)
+        return wrapper  # type: ignore
+    return decorator
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    if not _state.enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        _add_time(name, perf_counter() - start)
+
+
+def snapshot() -> Snapshot:
+    with _lock:
+        return {
+            'timers': {name: {'calls': _calls[name], 'seconds': _seconds[name]} for name in sorted(_calls)},
+            'counters': dict(sorted(_counters.items())),
+        }
+
+
+def merge(other: Snapshot) -> None:
+    """
+    Add the timers and counters of ``other``, as taken by ``snapshot`` in a worker process, to this process's.
+    """
+    with _lock:
+        for name, timer_ in other['timers'].items():
+            _calls[name] += timer_['calls']
+            _seconds[name] += timer_['seconds']
+        for name, n in other['counters'].items():
+            _counters[name] += n
+
+
+def call_profiled(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, Snapshot]:
+    """
+    Run ``fn(*args, **kwargs)`` in a worker process with instrumentation enabled, returning its result and what
+    it recorded, to be ``merge``d into the parent process.
+    """
+    enable()
+    reset()
+    result = fn(*args, **kwargs)
+    return result, snapshot()
+
+
+def report(profile: Snapshot, elapsed: float) -> str:
+    lines = ['%-44s %10s %12s %8s' % ('timer', 'calls', 'seconds', '% wall')]
+    stages: List[str] = [name for name in profile['timers'] if name.startswith('stage.')]
+    others = [name for name in profile['timers'] if not name.startswith('stage.')]
+    for name in stages + others:
+        timer_ = profile['timers'][name]
+        lines.append('%-44s %10d %12.3f %7.1f%%' % (
+            name, timer_['calls'], timer_['seconds'], 100 * timer_['seconds'] / elapsed if elapsed else 0))
+    lines.append('%-44s %10s' % ('counter', 'count'))
+    for name, n in profile['counters'].items():
+        lines.append('%-44s %10d' % (name, n))
+    return '\n'.join(lines)
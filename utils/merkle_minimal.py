@@ -1,29 +1,100 @@
-from utils.crypto import SHA256
-from utils.constants import ZERO_BYTES32
+from utils.crypto import (
+    SHA256,
+    SHA256_chunks,
+)
+from utils.constants import (
+    DEPOSIT_CONTRACT_TREE_DEPTH,
+    ZERO_BYTES32,
+)
 from math import log2
+import struct
+import threading
+from typing import (
+    Iterable,
+    List,
+    Sequence,
+    Union,
+)
 
+Buffer = Union[bytes, bytearray, memoryview]
 
-zerohashes = [ZERO_BYTES32]
-for layer in range(1, 100):
-    zerohashes.append(SHA256(zerohashes[layer - 1] + zerohashes[layer - 1]))
 
+class _ZeroHashes:
+    """
+    ``zerohashes[h]`` is the root of a tree of height ``h`` whose leaves are all zero, computed the first time a
+    level at least that deep is asked for. The levels are filled under a lock, as threads share the module's instance.
+    """
+    def __init__(self) -> None:
+        self._hashes = [ZERO_BYTES32]
+        self._lock = threading.Lock()
 
-def calc_merkle_tree_from_leaves(values, layer_count: int=32):
-    values = list(values)
-    tree = [values[::]]
+    def __getitem__(self, height: int) -> bytes:
+        if height >= len(self._hashes):
+            with self._lock:
+                while len(self._hashes) <= height:
+                    self._hashes.append(SHA256(self._hashes[-1] + self._hashes[-1]))
+        return self._hashes[height]
+
+
+zerohashes = _ZeroHashes()
+
+
+class Layer(Sequence[bytes]):
+    """
+    The nodes of one layer of a tree, stored contiguously 32 bytes each.
+    """
+    __slots__ = ('buffer',)
+
+    def __init__(self, buffer: bytes) -> None:
+        self.buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.buffer) // 32
+
+    def __getitem__(self, index):  # type: ignore
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('layer index out of range')
+        return self.buffer[index * 32:index * 32 + 32]
+
+
+def hash_layer(nodes: Buffer, height: int=0) -> bytes:
+    """
+    Return the parents of the 32-byte ``nodes`` at ``height``, hashing each pair straight out of the contiguous
+    buffer. An odd last node is paired with the zerohash of ``height``.
+    """
+    view = memoryview(nodes)
+    if len(view) % 64 == 0:
+        return SHA256_chunks(view, 64)
+    return SHA256_chunks(view[:-32], 64) + SHA256(bytes(view[-32:]) + zerohashes[height])
+
+
+def _join(values: Iterable[Buffer]) -> bytes:
+    return values.buffer if isinstance(values, Layer) else b''.join(values)
+
+
+def calc_merkle_tree_from_leaves(values, layer_count: int=32) -> List[Layer]:
+    layer = _join(values)
+    tree = [Layer(layer)]
     for h in range(layer_count):
-        if len(values) % 2 == 1:
-            values.append(zerohashes[h])
-        values = [SHA256(values[i] + values[i + 1]) for i in range(0, len(values), 2)]
-        tree.append(values[::])
+        layer = hash_layer(layer, h)
+        tree.append(Layer(layer))
     return tree
 
 
-def get_merkle_root(values, pad_to: int=1):
-    layer_count = int(log2(pad_to))
-    if len(values) == 0:
+def _root(layer: bytes, layer_count: int) -> bytes:
+    if not layer:
         return zerohashes[layer_count]
-    return calc_merkle_tree_from_leaves(values, layer_count)[-1][0]
+    for h in range(layer_count):
+        layer = hash_layer(layer, h)
+    return layer[:32]
+
+
+def get_merkle_root(values, pad_to: int=1) -> bytes:
+    return _root(_join(values), int(log2(pad_to)))
 
 
 def get_merkle_proof(tree, item_index: int):
@@ -34,35 +105,88 @@ def get_merkle_proof(tree, item_index: int):
     return proof
 
 
-def merkleize_chunks(chunks, pad_to: int=1):
-    count = len(chunks)
-    depth = max(count - 1, 0).bit_length()
-    max_depth = max(depth, (pad_to - 1).bit_length())
-    tmp = [b'' for _ in range(max_depth + 1)]
-
-    def merge(h, i):
-        j = 0
-        while True:
-            if i & (1 << j) == 0:
-                if i == count and j < depth:
-                    h = SHA256(h + zerohashes[j])  # keep going if we are complementing the void to the next power of 2
-                else:
-                    break
+def merkleize_chunks(chunks, pad_to: int=1) -> bytes:
+    """
+    Return the root of the 32-byte ``chunks`` padded with zero chunks to the next power of two, and to ``pad_to``.
+    """
+    depth = max(len(chunks) - 1, 0).bit_length()
+    return _root(_join(chunks), max(depth, (pad_to - 1).bit_length()))
+
+
+class MerkleAccumulator:
+    """
+    Incremental Merkle tree of the deposit contract: leaves are appended in O(depth) using the contract's
+    branch/zerohash algorithm, and every complete subtree root is kept in a contiguous per-level store so
+    that a proof for any leaf can be produced without the full tree.
+    """
+    _SNAPSHOT_HEADER = struct.Struct('<4sBQ')
+    _SNAPSHOT_MAGIC = b'MACC'
+
+    def __init__(self, depth: int=DEPOSIT_CONTRACT_TREE_DEPTH) -> None:
+        self.depth = depth
+        self.count = 0
+        # levels[h] holds the roots of the (count >> h) complete subtrees of height h, 32 bytes each.
+        self.levels = [bytearray() for _ in range(depth + 1)]
+
+    def _node(self, height: int, index: int) -> bytes:
+        level = self.levels[height]
+        if index < len(level) // 32:
+            return bytes(level[index * 32: index * 32 + 32])
+        if index << height >= self.count:
+            return zerohashes[height]
+        return SHA256(self._node(height - 1, 2 * index) + self._node(height - 1, 2 * index + 1))
+
+    def append(self, leaf: bytes) -> None:
+        assert len(leaf) == 32
+        assert self.count < 2**self.depth - 1
+        self.count += 1
+        self.levels[0] += leaf
+        height = 0
+        while (self.count >> height) & 1 == 0:
+            self.levels[height + 1] += SHA256(self.levels[height][-64:])
+            height += 1
+
+    def get_root(self) -> bytes:
+        node = ZERO_BYTES32
+        size = self.count
+        for height in range(self.depth):
+            if size & 1:
+                node = SHA256(self._node(height, size - 1) + node)
             else:
-                h = SHA256(tmp[j] + h)
-            j += 1
-        tmp[j] = h
+                node = SHA256(node + zerohashes[height])
+            size >>= 1
+        return node
 
-    # merge in leaf by leaf.
-    for i in range(count):
-        merge(chunks[i], i)
+    def get_deposit_root(self) -> bytes:
+        """
+        Return the root with the leaf count mixed in, as the deposit contract's ``get_deposit_root``.
+        """
+        return SHA256(self.get_root() + self.count.to_bytes(8, 'little') + b'\x00' * 24)
 
-    # complement with 0 if empty, or if not the right power of 2
-    if 1 << depth != count:
-        merge(zerohashes[0], count)
+    def get_proof(self, index: int) -> List[bytes]:
+        """
+        Return the ``depth`` sibling nodes of leaf ``index`` followed by the length mix-in chunk, so that the
+        proof verifies against ``get_deposit_root``.
+        """
+        assert index < self.count
+        proof = [self._node(height, (index >> height) ^ 1) for height in range(self.depth)]
+        proof.append(self.count.to_bytes(32, 'little'))
+        return proof
 
-    # the next power of two may be smaller than the ultimate virtual size, complement with zero-hashes at each depth.
-    for j in range(depth, max_depth):
-        tmp[j + 1] = SHA256(tmp[j] + zerohashes[j])
+    def save(self, file: str) -> None:
+        with open(file, 'wb') as f:
+            f.write(self._SNAPSHOT_HEADER.pack(self._SNAPSHOT_MAGIC, self.depth, self.count))
+            for level in self.levels:
+                f.write(level)
 
-    return tmp[max_depth]
+    @classmethod
+    def open(cls, file: str) -> 'MerkleAccumulator':
+        with open(file, 'rb') as f:
+            magic, depth, count = cls._SNAPSHOT_HEADER.unpack(f.read(cls._SNAPSHOT_HEADER.size))
+            assert magic == cls._SNAPSHOT_MAGIC
+            accumulator = cls(depth)
+            accumulator.count = count
+            for height in range(depth + 1):
+                accumulator.levels[height] = bytearray(f.read((count >> height) * 32))
+                assert len(accumulator.levels[height]) == (count >> height) * 32
+        return accumulator
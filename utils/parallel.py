@@ -0,0 +1,78 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from utils import instrumentation
+
+
+def available_memory() -> int:
+    """
+    Return the memory, in bytes, that can be handed to new processes without swapping.
+    """
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def worker_count(*, memory_per_task: int=0, max_workers: Optional[int]=None, memory_fraction: float=0.75) -> int:
+    """
+    Return the number of worker processes to use: ``max_workers`` (default: the CPU count),
+    capped so that ``memory_per_task`` per worker fits in ``memory_fraction`` of the available memory.
+    """
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    if memory_per_task > 0:
+        workers = min(workers, int(available_memory() * memory_fraction) // memory_per_task)
+    return max(workers, 1)
+
+
+def imap_bounded(fn: Callable[[Any], Any], iterable: Iterable[Any], *, num_workers: int,
+                 max_pending: Optional[int]=None, mp_context: Any=None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield ``(item, fn(item))`` for each item of ``iterable``, in order, evaluated over ``num_workers``
+    processes with at most ``max_pending`` (default: twice the workers) items in flight at any time.
+    A single worker evaluates in this process. While instrumentation is enabled, what the workers record is
+    merged into this process's.
+    """
+    if num_workers <= 1:
+        for item in iterable:
+            yield item, fn(item)
+        return
+    profiled = instrumentation.is_enabled()
+    task = partial(instrumentation.call_profiled, fn) if profiled else fn
+
+    def result(future: Any) -> Any:
+        if not profiled:
+            return future.result()
+        value, profile = future.result()
+        instrumentation.merge(profile)
+        return value
+
+    max_pending = max_pending or 2 * num_workers
+    pending: Deque[Tuple[Any, Any]] = deque()
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context) as executor:
+        for item in iterable:
+            pending.append((item, executor.submit(task, item)))
+            if len(pending) >= max_pending:
+                item, future = pending.popleft()
+                yield item, result(future)
+        while pending:
+            item, future = pending.popleft()
+            yield item, result(future)
@@ -0,0 +1,80 @@
+from queue import (
+    Empty,
+    Full,
+    Queue,
+)
+from threading import (
+    Event,
+    Thread,
+)
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+Stage = Callable[[Iterator[Any]], Iterator[Any]]
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+def _pump(items: Iterable[Any], queue: Queue, stop: Event) -> None:
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    try:
+        for item in items:
+            if not put(item):
+                return
+    except BaseException as e:
+        put(_Failure(e))
+        return
+    put(_END)
+
+
+def _drain(queue: Queue, stop: Event) -> Iterator[Any]:
+    while not stop.is_set():
+        try:
+            item = queue.get(timeout=0.1)
+        except Empty:
+            continue
+        if item is _END:
+            return
+        if isinstance(item, _Failure):
+            raise item.exception
+        yield item
+
+
+def staged(source: Iterable[Any], *stages: Stage, maxsize: int=4) -> Iterator[Any]:
+    """
+    Run ``source`` and each generator stage in its own thread, connected by queues holding at most
+    ``maxsize`` items, and yield the output of the last stage. An exception in any stage is re-raised
+    here, and closing the returned generator stops every stage.
+    """
+    stop = Event()
+    threads = []
+    upstream: Iterable[Any] = source
+    for stage in (iter,) + stages:
+        queue: Queue = Queue(maxsize)
+        thread = Thread(target=_pump, args=(stage(iter(upstream)), queue, stop), daemon=True)
+        thread.start()
+        threads.append(thread)
+        upstream = _drain(queue, stop)
+    try:
+        yield from upstream
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
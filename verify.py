@@ -0,0 +1,97 @@
+from argparse import ArgumentParser
+import sys
+from time import perf_counter
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+)
+
+from deposit import iter_deposit_data
+from utils.bls import bls_batch_verify
+from utils.deposit_roots import DepositRoots
+
+SignatureCheck = Tuple[int, bytes, bytes, bytes]  # (index, pubkey, signing_root, signature)
+
+
+def get_args():
+    parser = ArgumentParser(description='🦄 : verify deposit data files')
+    parser.add_argument('files', nargs='+', help='deposit_data.json files to verify')
+    parser.add_argument('--batch_size', type=int, default=64, help='Number of signatures checked per batch verification')  # noqa: E501
+
+    args = parser.parse_args()
+    return args
+
+
+def find_invalid_signatures(checks: List[SignatureCheck]) -> List[int]:
+    """
+    Return the indices of the invalid signatures in ``checks``: the whole batch is verified at once, and only
+    if that fails is it split in halves to search for the bad entries.
+    """
+    if not checks:
+        return []
+    _, pubkeys, signing_roots, signatures = zip(*checks)
+    if bls_batch_verify(pubkeys, signing_roots, signatures):
+        return []
+    if len(checks) == 1:
+        return [checks[0][0]]
+    middle = len(checks) // 2
+    return find_invalid_signatures(checks[:middle]) + find_invalid_signatures(checks[middle:])
+
+
+def verify_deposit_data(entries: Iterable[Dict[str, Any]], batch_size: int=64,
+                        check_signatures: bool=True) -> Iterator[Tuple[int, str]]:
+    """
+    Check the ``deposit_data_root`` and (unless ``check_signatures`` is false) the signature of each deposit
+    data entry, yielding ``(index, reason)`` for every problem found. Signatures are verified ``batch_size``
+    at a time.
+    """
+    batch: List[SignatureCheck] = []
+    for index, entry in enumerate(entries):
+        try:
+            pubkey, signature = bytes.fromhex(entry['pubkey']), bytes.fromhex(entry['signature'])
+            roots = DepositRoots(pubkey, bytes.fromhex(entry['withdrawal_credentials']), int(entry['amount']))
+            deposit_data_root = roots.data_root(signature)
+            signing_root = roots.signing_root()
+        except (KeyError, TypeError, ValueError) as e:
+            yield index, 'malformed entry (%s: %s)' % (type(e).__name__, e)
+            continue
+        if deposit_data_root.hex() != entry.get('deposit_data_root'):
+            yield index, 'deposit_data_root does not match the entry'
+        if not check_signatures:
+            continue
+        batch.append((index, pubkey, signing_root, signature))
+        if len(batch) == batch_size:
+            yield from ((i, 'invalid signature') for i in find_invalid_signatures(batch))
+            batch = []
+    yield from ((i, 'invalid signature') for i in find_invalid_signatures(batch))
+
+
+def main():
+    args = get_args()
+    invalid_files = 0
+    for file in args.files:
+        count = 0
+
+        def counted(entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            nonlocal count
+            for entry in entries:
+                count += 1
+                yield entry
+
+        start = perf_counter()
+        problems = sorted(verify_deposit_data(counted(iter_deposit_data(file)), batch_size=args.batch_size))
+        elapsed = perf_counter() - start
+        for index, reason in problems:
+            print('%s[%s]: %s' % (file, index, reason))
+        print('%s: verified %s entries in %.2fs (%.2f entries/s), %s problems found.' % (
+            file, count, elapsed, count / elapsed if elapsed else 0, len(problems)))
+        invalid_files += bool(problems)
+    sys.exit(1 if invalid_files else 0)
+
+
+if __name__ == '__main__':
+    main()